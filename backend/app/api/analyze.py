@@ -1,10 +1,11 @@
 import uuid
 import asyncio
+import hashlib
 import time
 from collections import defaultdict
 from pathlib import Path
 from typing import Optional
-from fastapi import APIRouter, UploadFile, File, Form, BackgroundTasks, HTTPException, Depends, Request
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Request
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
@@ -12,14 +13,39 @@ import aiofiles
 
 from app.models.database import Analysis, Difference, get_db
 from app.core.config import UPLOAD_PATH, settings
-from app.services.image_processor import load_and_normalize, save_marked_image, get_image_dimensions, scale_regions_to_original
+from app.core.executor import run_cpu
+from app.services.job_queue import enqueue_job
+from app.services.blob_store import new_temp_path, store_blob
+from app.services.image_processor import ImageContext, save_marked_image, probe_image, scale_regions_to_original
 from app.services.pixel_diff import compute_diff
 from app.services.element_analyzer import detect_and_compare, format_differences_with_labels, analyze_pixel_regions
-from app.services.gemini_analyzer import label_bands, find_visual_diffs, analyze_uncovered_regions
+from app.services.gemini_analyzer import (
+    label_bands, find_visual_diffs, analyze_uncovered_regions, log_cache_stats,
+)
+from app.services.pipeline import Stage, run_stage_graph
+from app.services.bbox_index import BBoxIndex
 router = APIRouter(prefix="/api/analyze", tags=["analyze"])
 
-ALLOWED_TYPES = {"image/png", "image/jpeg", "image/webp"}
+# 허용 포맷 — 클라이언트가 보낸 content_type 대신 파일 앞부분(매직 바이트)으로 판별
+IMAGE_SIGNATURES = {
+    "PNG": lambda head: head.startswith(b"\x89PNG\r\n\x1a\n"),
+    "JPEG": lambda head: head.startswith(b"\xff\xd8\xff"),
+    "WEBP": lambda head: head[:4] == b"RIFF" and head[8:12] == b"WEBP",
+}
+SNIFF_BYTES = 12
 MAX_FILE_SIZE = 20 * 1024 * 1024  # 20MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024   # 스풀 → 저장소 복사 단위
+# 업로드 요청 전체 상한 (이미지 2장 + 폼 필드/경계 여유) — main.py의 BodySizeLimitMiddleware가 폼 파싱 전에 적용
+MAX_REQUEST_SIZE = 2 * MAX_FILE_SIZE + 1024 * 1024
+
+# ─── 파이프라인 → 픽셀 차이 엔진 (pixel_diff.DIFF_ENGINES) ───
+# pipeline_version은 결과 캐시 키에도 들어가므로 엔진마다 별도 id.
+PIPELINE_DIFF_ENGINES = {
+    "v1_cv": "ssim",           # 기본: 회색조 SSIM
+    "v1_cv_fast": "absdiff",   # CI용 빠른 검사
+    "v1_cv_deltae": "deltae",  # 색상 정밀 검사 (CIEDE2000)
+}
+DEFAULT_PIPELINE = "v1_cv"
 
 # ─── Rate Limiting (IP당 분석 횟수 제한) ───
 # 배포 시 Gemini API 비용 보호용
@@ -43,15 +69,65 @@ def _check_rate_limit(client_ip: str):
     _rate_store[client_ip].append(now)
 
 
-async def _save_upload(file: UploadFile, dest: Path) -> str:
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(400, "파일이 너무 큽니다. 20MB 이하로 올려주세요.")
-    if file.content_type not in ALLOWED_TYPES:
-        raise HTTPException(400, "지원하지 않는 형식입니다. PNG, JPG, WebP만 가능합니다.")
-    async with aiofiles.open(dest, "wb") as f:
-        await f.write(content)
-    return str(dest)
+def _sniff_image_format(head: bytes) -> Optional[str]:
+    """매직 바이트로 이미지 포맷 판별. 허용 포맷이 아니면 None."""
+    for fmt, matches in IMAGE_SIGNATURES.items():
+        if matches(head):
+            return fmt
+    return None
+
+
+async def _save_upload(file: UploadFile, dest: Path) -> tuple:
+    """
+    업로드를 청크 단위로 dest에 복사하고 (SHA-256 hex, 포맷)을 반환.
+
+    이 시점의 본문은 이미 Starlette가 임시 파일로 스풀해 둔 상태다 — 수신량 상한은
+    BodySizeLimitMiddleware(MAX_REQUEST_SIZE)가 폼 파싱 전에 건다.
+    여기서는 파일별 MAX_FILE_SIZE를 넘는 순간 중단하고 쓰던 파일을 지우며,
+    포맷은 첫 청크의 매직 바이트로 검사한다.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    try:
+        async with aiofiles.open(dest, "wb") as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if len(head) < SNIFF_BYTES:
+                    head += chunk[:SNIFF_BYTES - len(head)]
+                    if len(head) >= SNIFF_BYTES and not _sniff_image_format(head):
+                        raise HTTPException(400, "지원하지 않는 형식입니다. PNG, JPG, WebP만 가능합니다.")
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    raise HTTPException(400, "파일이 너무 큽니다. 20MB 이하로 올려주세요.")
+                digest.update(chunk)
+                await f.write(chunk)
+        fmt = _sniff_image_format(head)
+        if not fmt:
+            raise HTTPException(400, "지원하지 않는 형식입니다. PNG, JPG, WebP만 가능합니다.")
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+    return digest.hexdigest(), fmt
+
+
+def _file_url(path: str) -> str:
+    """저장 경로 → /api/files URL (blob은 UPLOAD_PATH 기준 하위 경로 포함)."""
+    try:
+        rel = Path(path).resolve().relative_to(UPLOAD_PATH.resolve())
+    except ValueError:
+        rel = Path(Path(path).name)
+    return f"/api/files/{rel.as_posix()}"
+
+
+def _set_image_meta(analysis: Analysis, prefix: str, meta: dict):
+    """probe_image() 결과를 Analysis의 {prefix}_width/height/format/bytes 컬럼에 기록."""
+    setattr(analysis, f"{prefix}_width", meta["width"])
+    setattr(analysis, f"{prefix}_height", meta["height"])
+    setattr(analysis, f"{prefix}_format", meta["format"])
+    setattr(analysis, f"{prefix}_bytes", meta["bytes"])
 
 
 def _pixel_regions_to_diffs(
@@ -239,56 +315,48 @@ def _deduplicate_qa_results(diffs: list, img_h: int, img_w: int = 0) -> list:
             filtered_others.append(d)
 
     # ── 3단계: 동일 영역 중복 제거 (bbox 겹침 기반) ──
+    # Y 구간만 비교하므로 x는 고정한 박스로 인덱싱 (final과 같은 순서의 id)
+    priority = {"spacing": 0, "content": 1, "layout": 2,
+                "typography": 3, "visual": 4}
     combined = spacing_diffs + filtered_others
     final = []
+    y_index = BBoxIndex()
     for d in combined:
         is_dup = False
         dy = d.get("bbox_y", 0)
         dh = d.get("bbox_h", 0)
 
-        for j, existing in enumerate(final):
-            ey = existing.get("bbox_y", 0)
-            eh = existing.get("bbox_h", 0)
-
-            overlap_start = max(dy, ey)
-            overlap_end = min(dy + dh, ey + eh)
-            if overlap_end > overlap_start:
-                overlap = overlap_end - overlap_start
-                min_h = min(dh, eh)
-                if min_h > 0 and overlap / min_h > 0.8:
-                    # 더 구체적인(spacing > layout > visual) 것을 유지
-                    priority = {"spacing": 0, "content": 1, "layout": 2,
-                                "typography": 3, "visual": 4}
-                    d_pri = priority.get(d.get("category", ""), 5)
-                    e_pri = priority.get(existing.get("category", ""), 5)
-                    if d_pri < e_pri:
-                        final[j] = d
-                    is_dup = True
-                    break
+        for j in y_index.intersecting((0, dy, 1, dh)):
+            _, ey, _, eh = y_index.box(j)
+            overlap = min(dy + dh, ey + eh) - max(dy, ey)
+            min_h = min(dh, eh)
+            if min_h > 0 and overlap / min_h > 0.8:
+                # 더 구체적인(spacing > layout > visual) 것을 유지
+                d_pri = priority.get(d.get("category", ""), 5)
+                e_pri = priority.get(final[j].get("category", ""), 5)
+                if d_pri < e_pri:
+                    final[j] = d
+                    y_index.update(j, (0, dy, 1, dh))
+                is_dup = True
+                break
 
         if not is_dup:
             final.append(d)
+            y_index.insert((0, dy, 1, dh))
 
     # ── 4단계: spacing 간 인과관계 정리 ──
     # 같은 위치의 spacing이 여러 개면 가장 구체적인 것만 유지
     # (예: "콘텐츠↔텍스트 간격" + "섹션 간격"이 같은 Y면 하나만)
-    seen_y_ranges = []
+    seen_spacing = BBoxIndex()  # 이미 남긴 spacing의 Y 위치 (점)
     deduped_final = []
     for d in final:
         dy = d.get("bbox_y", 0)
-        dh = d.get("bbox_h", 0)
-
-        # 이미 같은 Y 범위에 spacing이 있으면 skip
-        is_y_dup = False
-        for sy, sh in seen_y_ranges:
-            if abs(dy - sy) < 15 and d.get("category") == "spacing":
-                is_y_dup = True
-                break
-        if is_y_dup:
-            continue
 
+        # 이미 같은 Y 범위(±14px)에 spacing이 있으면 skip
         if d.get("category") == "spacing":
-            seen_y_ranges.append((dy, dh))
+            if seen_spacing.nearest(0, dy, max_dist=14) is not None:
+                continue
+            seen_spacing.insert((0, dy, 0, 0))
         deduped_final.append(d)
 
     # ── 5단계: 심각도 + 카테고리 순 정렬 ──
@@ -310,39 +378,157 @@ def _find_uncovered_regions(
     pixel_regions: list, cv_diffs: list, coverage_thresh: float = 0.5
 ) -> list:
     """pixel diff 영역 중 CV가 커버하지 못한 영역만 추출."""
+    # CV diff bbox 인덱스 — pixel region마다 겹치는 것만 검사
+    cv_index = BBoxIndex()
+    for cd in cv_diffs:
+        cv_index.insert((
+            cd.get("bbox_x", 0), cd.get("bbox_y", 0),
+            cd.get("bbox_w", 0), cd.get("bbox_h", 0),
+        ))
+
     uncovered = []
     for pr in pixel_regions:
-        px, py, pw, ph = pr["x"], pr["y"], pr["w"], pr["h"]
-        pr_area = pw * ph
-        if pr_area <= 0:
+        if pr["w"] * pr["h"] <= 0:
             continue
+        max_coverage = cv_index.max_coverage((pr["x"], pr["y"], pr["w"], pr["h"]))
+        if max_coverage < coverage_thresh:
+            uncovered.append(pr)
 
-        # CV diff bbox들과 겹침 비율 계산
-        max_coverage = 0.0
-        for cd in cv_diffs:
-            cx = cd.get("bbox_x", 0)
-            cy = cd.get("bbox_y", 0)
-            cw = cd.get("bbox_w", 0)
-            ch = cd.get("bbox_h", 0)
+    return uncovered
 
-            ix1 = max(px, cx)
-            iy1 = max(py, cy)
-            ix2 = min(px + pw, cx + cw)
-            iy2 = min(py + ph, cy + ch)
 
-            if ix2 > ix1 and iy2 > iy1:
-                inter = (ix2 - ix1) * (iy2 - iy1)
-                coverage = inter / pr_area
-                max_coverage = max(max_coverage, coverage)
+def _scale_design_bboxes(diffs: list, scale_back: float):
+    """design_bbox 좌표를 정규화(dev 너비) 공간 → 원본 디자인 공간으로 변환."""
+    for d in diffs:
+        if "design_bbox_x" in d:
+            d["design_bbox_x"] = int(d["design_bbox_x"] * scale_back)
+            d["design_bbox_y"] = int(d["design_bbox_y"] * scale_back)
+            d["design_bbox_w"] = int(d["design_bbox_w"] * scale_back)
+            d["design_bbox_h"] = int(d["design_bbox_h"] * scale_back)
 
-        if max_coverage < coverage_thresh:
-            uncovered.append(pr)
 
-    return uncovered
+# ═══ 파이프라인 스테이지 ═══
+# CV 스테이지는 프로세스 풀, AI 스테이지는 Gemini 네트워크 대기 —
+# 스테이지 그래프 스케줄러가 서로 의존하지 않는 스테이지를 겹쳐서 실행한다.
+
+async def _stage_pixel_diff(
+    normalized: tuple, dev_w: int, dev_h: int, diff_engine: str,
+):
+    """픽셀 비교 (유사도 + 차이 영역 — ground truth)."""
+    img_a, img_b = normalized
+    norm_h, norm_w = img_b.shape[:2]
+    similarity, pixel_regions = await run_cpu(compute_diff, img_a, img_b, engine=diff_engine)
+    print(f"[Analysis] 유사도: {similarity}%, pixel diff 영역: {len(pixel_regions)}개")
+
+    # pixel_regions 좌표를 정규화 공간 → 원본 dev 공간으로 변환
+    scale_x = dev_w / norm_w if norm_w > 0 else 1.0
+    scale_y = dev_h / norm_h if norm_h > 0 else 1.0
+    for r in pixel_regions:
+        r["x"] = int(r["x"] * scale_x)
+        r["y"] = int(r["y"] * scale_y)
+        r["w"] = int(r["w"] * scale_x)
+        r["h"] = int(r["h"] * scale_y)
+    return similarity, pixel_regions
+
+
+async def _stage_cv_measure(aligned: tuple, design_size: tuple):
+    """CV 기반 정밀 측정 — 간격, 마진, 높이."""
+    design_crop, dev_crop = aligned
+    cv_diffs, design_bands, dev_bands = await run_cpu(
+        detect_and_compare, design_crop, dev_crop, design_size,
+    )
+    print(f"[Analysis] CV 측정: {len(cv_diffs)}개 간격 차이, "
+          f"밴드 {len(design_bands)}(디자인)/{len(dev_bands)}(개발)")
+    return cv_diffs, design_bands, dev_bands
+
+
+async def _stage_ai_label(
+    ctx: ImageContext, cv_diffs: list, design_bands: list, dev_bands: list,
+    dev_w: int, dev_h: int, scale_back: float,
+):
+    """밴드에 의미론적 이름 부여 → CV 측정 결과를 사람이 읽을 수 있는 형태로 변환."""
+    labels = await label_bands(ctx.dev_rgb, dev_bands)
+    print(f"[Analysis] AI 라벨: {labels}")
+
+    spacing_diffs = format_differences_with_labels(
+        cv_diffs, design_bands, dev_bands, labels, dev_w, dev_h,
+    )
+    _scale_design_bboxes(spacing_diffs, scale_back)
+    return spacing_diffs
+
+
+async def _stage_ai_visual(ctx: ImageContext, dev_w: int, dev_h: int):
+    """전체 화면 비-간격 차이 감지 (색상/타이포/누락) — 다른 스테이지와 무관."""
+    return await find_visual_diffs(ctx.design_rgb, ctx.dev_rgb, dev_w, dev_h)
+
+
+async def _stage_ai_targeted(
+    ctx: ImageContext, pixel_regions: list, spacing_diffs: list, dev_w: int, dev_h: int,
+):
+    """pixel diff 영역 중 CV가 커버하지 못한 영역을 Gemini에 타겟 분석."""
+    uncovered = _find_uncovered_regions(pixel_regions, spacing_diffs)
+    print(f"[Analysis] pixel diff {len(pixel_regions)}개 중 미커버: {len(uncovered)}개")
+    return await analyze_uncovered_regions(ctx.design_rgb, ctx.dev_rgb, uncovered, dev_w, dev_h)
+
+
+async def _stage_finalize(
+    analysis_id: str, ctx: ImageContext, aligned: tuple, pixel_regions: list,
+    spacing_diffs: list, visual_diffs: list, targeted_diffs: list,
+    dev_w: int, dev_h: int, scale_back: float,
+):
+    """결과 통합 — CV(정확) + AI 전체(보완) + AI 타겟(미커버) → 정리 → 마킹 이미지."""
+    diff_data = spacing_diffs + visual_diffs + targeted_diffs
+    print(f"[Analysis] 최종: CV {len(spacing_diffs)}개 + AI전체 {len(visual_diffs)}개 + AI타겟 {len(targeted_diffs)}개 = {len(diff_data)}개")
+
+    # ── v7: 픽셀 diff 영역 CV 정밀 분석 (AI 대체) ──
+    final_uncovered = _find_uncovered_regions(pixel_regions, diff_data)
+    if final_uncovered:
+        design_crop, dev_crop = aligned
+        pixel_cv_diffs = await run_cpu(
+            analyze_pixel_regions,
+            design_crop, dev_crop, final_uncovered, dev_w, dev_h
+        )
+        if pixel_cv_diffs:
+            _scale_design_bboxes(pixel_cv_diffs, scale_back)
+            diff_data.extend(pixel_cv_diffs)
+            print(f"[Analysis] 픽셀CV 분석: 미커버 {len(final_uncovered)}개 → {len(pixel_cv_diffs)}개 추가")
+
+    # ── v9: QA 결과 정리 (UX디자이너→개발자 전달 관점) ──
+    before_count = len(diff_data)
+    diff_data = _deduplicate_qa_results(diff_data, dev_h, dev_w)
+    print(f"[Analysis] QA정리: {before_count}개 → {len(diff_data)}개 (중복/무의미 {before_count - len(diff_data)}개 제거)")
+
+    # 마킹 이미지 생성
+    marked_path = str(UPLOAD_PATH / f"{analysis_id}_marked.png")
+    await run_cpu(save_marked_image, ctx.dev_rgb, diff_data, marked_path)
+    return diff_data, marked_path
+
+
+ANALYSIS_STAGES = [
+    Stage("normalize", _stage_pixel_diff,
+          inputs=("normalized", "dev_w", "dev_h", "diff_engine"),
+          outputs=("similarity", "pixel_regions")),
+    Stage("cv_measure", _stage_cv_measure,
+          inputs=("aligned", "design_size"),
+          outputs=("cv_diffs", "design_bands", "dev_bands")),
+    Stage("ai_label", _stage_ai_label,
+          inputs=("ctx", "cv_diffs", "design_bands", "dev_bands", "dev_w", "dev_h", "scale_back"),
+          outputs=("spacing_diffs",)),
+    Stage("ai_visual", _stage_ai_visual,
+          inputs=("ctx", "dev_w", "dev_h"),
+          outputs=("visual_diffs",)),
+    Stage("ai_targeted", _stage_ai_targeted, step="ai_visual",
+          inputs=("ctx", "pixel_regions", "spacing_diffs", "dev_w", "dev_h"),
+          outputs=("targeted_diffs",)),
+    Stage("finalize", _stage_finalize,
+          inputs=("analysis_id", "ctx", "aligned", "pixel_regions", "spacing_diffs",
+                  "visual_diffs", "targeted_diffs", "dev_w", "dev_h", "scale_back"),
+          outputs=("diff_data", "marked_path")),
+]
 
 
 async def _run_analysis(analysis_id: str):
-    """BackgroundTask: 실제 AI 분석 파이프라인 실행."""
+    """분석 워커(app.worker)가 호출: 실제 AI 분석 파이프라인 실행."""
     from app.models.database import AsyncSessionLocal
     async with AsyncSessionLocal() as db:
         result = await db.execute(select(Analysis).where(Analysis.id == analysis_id))
@@ -355,106 +541,48 @@ async def _run_analysis(analysis_id: str):
             analysis.progress_step = "normalize"
             await db.commit()
 
-            design_path = analysis.design_image_path
-            dev_path = analysis.dev_image_path
-
-            # Step 1: 원본 이미지 크기 조회
-            dev_w, dev_h = get_image_dimensions(dev_path)
+            # 두 이미지를 한 번만 디코딩 — 모든 스테이지가 같은 배열을 공유
+            ctx = await asyncio.to_thread(
+                ImageContext.load, analysis.design_image_path, analysis.dev_image_path,
+            )
+            dev_w, dev_h = ctx.dev_size
+            design_w, _design_h = ctx.design_size
             print(f"[Analysis] 개발 이미지 크기: {dev_w}x{dev_h}")
 
-            # Step 2: 픽셀 비교 (유사도 + 차이 영역 — ground truth)
-            img_a, img_b, orig_a_size, orig_b_size = load_and_normalize(design_path, dev_path)
-            norm_h, norm_w = img_b.shape[:2]
-            similarity, pixel_regions = compute_diff(img_a, img_b)
-            analysis.similarity_score = similarity
-            print(f"[Analysis] 유사도: {similarity}%, pixel diff 영역: {len(pixel_regions)}개")
-
-            # pixel_regions 좌표를 정규화 공간 → 원본 dev 공간으로 변환
-            scale_x = dev_w / norm_w if norm_w > 0 else 1.0
-            scale_y = dev_h / norm_h if norm_h > 0 else 1.0
-            for r in pixel_regions:
-                r["x"] = int(r["x"] * scale_x)
-                r["y"] = int(r["y"] * scale_y)
-                r["w"] = int(r["w"] * scale_x)
-                r["h"] = int(r["h"] * scale_y)
-
-            # ═══ CV 측정 + AI 라벨링 파이프라인 ═══
-
-            # Step 3: CV 기반 정밀 측정 — 간격, 마진, 높이
-            analysis.progress_step = "cv_measure"
-            await db.commit()
-            cv_diffs, design_bands, dev_bands = detect_and_compare(design_path, dev_path)
-            print(f"[Analysis] CV 측정: {len(cv_diffs)}개 간격 차이, "
-                  f"밴드 {len(design_bands)}(디자인)/{len(dev_bands)}(개발)")
-
-            # Step 4: Gemini AI — 밴드 라벨링 + 시각적 차이 감지
-            # 4a: 밴드에 의미론적 이름 부여
-            analysis.progress_step = "ai_label"
-            await db.commit()
-            labels = await label_bands(dev_path, dev_bands)
-            print(f"[Analysis] AI 라벨: {labels}")
-
-            # 4b: CV 측정 결과를 라벨과 결합하여 사람이 읽을 수 있는 형태로 변환
-            spacing_diffs = format_differences_with_labels(
-                cv_diffs, design_bands, dev_bands, labels, dev_w, dev_h,
+            # 리사이즈 변형(픽셀 diff용 / CV용)은 여기서 한 번만 만들고,
+            # 프로세스 풀에는 ctx 대신 각 스테이지가 쓰는 배열만 넘긴다
+            normalized, aligned = await asyncio.gather(
+                asyncio.to_thread(ctx.normalized),
+                asyncio.to_thread(ctx.aligned),
             )
 
-            # 4b-2: design_bbox 좌표를 정규화 공간 → 원본 디자인 공간으로 변환
-            design_w_orig, design_h_orig = get_image_dimensions(design_path)
-            scale_back = design_w_orig / dev_w if dev_w > 0 else 1.0
-            for d in spacing_diffs:
-                if "design_bbox_x" in d:
-                    d["design_bbox_x"] = int(d["design_bbox_x"] * scale_back)
-                    d["design_bbox_y"] = int(d["design_bbox_y"] * scale_back)
-                    d["design_bbox_w"] = int(d["design_bbox_w"] * scale_back)
-                    d["design_bbox_h"] = int(d["design_bbox_h"] * scale_back)
-
-            # 4c: pixel diff 영역 중 CV가 커버하지 못한 영역 추출
-            analysis.progress_step = "ai_visual"
-            await db.commit()
-
-            uncovered = _find_uncovered_regions(pixel_regions, spacing_diffs)
-            print(f"[Analysis] pixel diff {len(pixel_regions)}개 중 미커버: {len(uncovered)}개")
-
-            # 4d: 미커버 영역을 Gemini에 타겟 분석 + 전체 비-간격 차이 감지
-            visual_diffs = await find_visual_diffs(design_path, dev_path, dev_w, dev_h)
-            targeted_diffs = await analyze_uncovered_regions(
-                design_path, dev_path, uncovered, dev_w, dev_h
+            async def on_step(step: str, results: dict):
+                # 스케줄러 코루틴에서만 호출되므로 세션을 동시에 쓰지 않음
+                if "similarity" in results:
+                    analysis.similarity_score = results["similarity"]
+                analysis.progress_step = step
+                await db.commit()
+
+            results = await run_stage_graph(
+                ANALYSIS_STAGES,
+                {
+                    "analysis_id": analysis_id,
+                    "ctx": ctx,
+                    "normalized": normalized,
+                    "aligned": aligned,
+                    "design_size": ctx.design_size,
+                    "dev_w": dev_w,
+                    "dev_h": dev_h,
+                    "scale_back": design_w / dev_w if dev_w > 0 else 1.0,
+                    "diff_engine": PIPELINE_DIFF_ENGINES.get(analysis.pipeline_version, "ssim"),
+                },
+                on_step=on_step,
             )
+            diff_data = results["diff_data"]
+            analysis.similarity_score = results["similarity"]
+            analysis.marked_image_path = results["marked_path"]
 
-            # Step 5: 결과 통합 — CV(정확) + AI 전체(보완) + AI 타겟(미커버)
-            analysis.progress_step = "finalize"
-            await db.commit()
-            diff_data = spacing_diffs + visual_diffs + targeted_diffs
-            print(f"[Analysis] 최종: CV {len(spacing_diffs)}개 + AI전체 {len(visual_diffs)}개 + AI타겟 {len(targeted_diffs)}개 = {len(diff_data)}개")
-
-            # ── v7: 픽셀 diff 영역 CV 정밀 분석 (AI 대체) ──
-            final_uncovered = _find_uncovered_regions(pixel_regions, diff_data)
-            if final_uncovered:
-                pixel_cv_diffs = analyze_pixel_regions(
-                    design_path, dev_path, final_uncovered, dev_w, dev_h
-                )
-                if pixel_cv_diffs:
-                    for d in pixel_cv_diffs:
-                        if "design_bbox_x" in d:
-                            d["design_bbox_x"] = int(d["design_bbox_x"] * scale_back)
-                            d["design_bbox_y"] = int(d["design_bbox_y"] * scale_back)
-                            d["design_bbox_w"] = int(d["design_bbox_w"] * scale_back)
-                            d["design_bbox_h"] = int(d["design_bbox_h"] * scale_back)
-                    diff_data.extend(pixel_cv_diffs)
-                    print(f"[Analysis] 픽셀CV 분석: 미커버 {len(final_uncovered)}개 → {len(pixel_cv_diffs)}개 추가")
-
-            # ── v9: QA 결과 정리 (UX디자이너→개발자 전달 관점) ──
-            before_count = len(diff_data)
-            diff_data = _deduplicate_qa_results(diff_data, dev_h, dev_w)
-            print(f"[Analysis] QA정리: {before_count}개 → {len(diff_data)}개 (중복/무의미 {before_count - len(diff_data)}개 제거)")
-
-            # Step 6: 마킹 이미지 생성
-            marked_path = str(UPLOAD_PATH / f"{analysis_id}_marked.png")
-            save_marked_image(dev_path, diff_data, marked_path)
-            analysis.marked_image_path = marked_path
-
-            # Step 7: DB 저장
+            # DB 저장
             for d in diff_data:
                 diff = Difference(
                     analysis_id=analysis_id,
@@ -477,6 +605,7 @@ async def _run_analysis(analysis_id: str):
             analysis.status = "done"
             await db.commit()
             print(f"[Analysis] 분석 완료: {analysis_id}")
+            await log_cache_stats()
 
         except Exception as e:
             print(f"[Analysis] 분석 실패: {e}")
@@ -486,22 +615,78 @@ async def _run_analysis(analysis_id: str):
             raise
 
 
+async def _find_cached_analysis(
+    db: AsyncSession, design_sha256: str, dev_sha256: str, pipeline_version: str,
+) -> Optional[Analysis]:
+    """같은 이미지 쌍 + 같은 파이프라인으로 완료된 가장 최근 분석."""
+    result = await db.execute(
+        select(Analysis)
+        .where(
+            Analysis.design_sha256 == design_sha256,
+            Analysis.dev_sha256 == dev_sha256,
+            Analysis.pipeline_version == pipeline_version,
+            Analysis.status == "done",
+        )
+        .order_by(Analysis.created_at.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def _clone_differences(db: AsyncSession, source_id: str, target_id: str) -> int:
+    """원본 분석의 Difference 행을 새 분석으로 복제 (승인/무시 상태는 초기화)."""
+    result = await db.execute(
+        select(Difference).where(Difference.analysis_id == source_id)
+    )
+    count = 0
+    for d in result.scalars().all():
+        db.add(Difference(
+            analysis_id=target_id,
+            category=d.category,
+            severity=d.severity,
+            description=d.description,
+            design_value=d.design_value,
+            dev_value=d.dev_value,
+            bbox_x=d.bbox_x,
+            bbox_y=d.bbox_y,
+            bbox_w=d.bbox_w,
+            bbox_h=d.bbox_h,
+            design_bbox_x=d.design_bbox_x,
+            design_bbox_y=d.design_bbox_y,
+            design_bbox_w=d.design_bbox_w,
+            design_bbox_h=d.design_bbox_h,
+        ))
+        count += 1
+    return count
+
+
 def _select_pipeline(pipeline: str) -> str:
-    """파이프라인 선택. 현재는 v1_cv만 지원."""
-    return "v1_cv"
+    """파이프라인 선택. "auto"(또는 빈 값)는 v1_cv, 그 외는 PIPELINE_DIFF_ENGINES의 id."""
+    if not pipeline or pipeline == "auto":
+        return DEFAULT_PIPELINE
+    if pipeline not in PIPELINE_DIFF_ENGINES:
+        raise HTTPException(
+            400, f"지원하지 않는 파이프라인입니다: {pipeline} (가능: auto, {', '.join(PIPELINE_DIFF_ENGINES)})"
+        )
+    return pipeline
 
 
 @router.post("")
 async def start_analysis(
     request: Request,
-    background_tasks: BackgroundTasks,
     design_image: UploadFile = File(...),
     dev_image: UploadFile = File(...),
     figma_url: str = Form(default=""),
     pipeline: str = Form(default="auto"),
+    force: bool = Form(default=False),
     db: AsyncSession = Depends(get_db),
 ):
-    """이미지 업로드 후 분석 시작."""
+    """
+    이미지 업로드 후 분석 시작.
+
+    같은 이미지 쌍(SHA-256)과 파이프라인으로 완료된 분석이 있으면 결과를 복제해
+    즉시 done으로 반환한다. force=true면 캐시를 무시하고 다시 분석.
+    """
     # Rate limit 체크
     client_ip = request.client.host if request.client else "unknown"
     _check_rate_limit(client_ip)
@@ -509,29 +694,72 @@ async def start_analysis(
     selected_pipeline = _select_pipeline(pipeline)
 
     analysis_id = str(uuid.uuid4())
-    design_path = UPLOAD_PATH / f"{analysis_id}_design{Path(design_image.filename).suffix}"
-    dev_path = UPLOAD_PATH / f"{analysis_id}_dev{Path(dev_image.filename).suffix}"
+    # 임시 파일로 스트리밍 → 해시 확정 후 내용 주소 blob으로 이동 (중복 업로드는 1벌만 저장)
+    design_tmp = new_temp_path()
+    dev_tmp = new_temp_path()
+
+    try:
+        design_sha256, design_fmt = await _save_upload(design_image, design_tmp)
+        dev_sha256, dev_fmt = await _save_upload(dev_image, dev_tmp)
+
+        # 헤더만 읽어 크기/포맷 기록 (픽셀 디코딩 없음)
+        try:
+            design_meta, dev_meta = await asyncio.gather(
+                asyncio.to_thread(probe_image, str(design_tmp)),
+                asyncio.to_thread(probe_image, str(dev_tmp)),
+            )
+        except Exception:
+            raise HTTPException(400, "이미지 파일을 읽을 수 없습니다.")
 
-    await _save_upload(design_image, design_path)
-    await _save_upload(dev_image, dev_path)
+        design_path = await store_blob(db, design_tmp, design_sha256, design_fmt)
+        dev_path = await store_blob(db, dev_tmp, dev_sha256, dev_fmt)
+    finally:
+        design_tmp.unlink(missing_ok=True)
+        dev_tmp.unlink(missing_ok=True)
 
     analysis = Analysis(
         id=analysis_id,
-        design_image_path=str(design_path),
-        dev_image_path=str(dev_path),
+        design_image_path=design_path,
+        dev_image_path=dev_path,
         status="pending",
         pipeline_version=selected_pipeline,
+        design_sha256=design_sha256,
+        dev_sha256=dev_sha256,
     )
+    _set_image_meta(analysis, "design", design_meta)
+    _set_image_meta(analysis, "dev", dev_meta)
+
+    # ── 결과 캐시: 동일 이미지 쌍 재제출이면 CV/Gemini 파이프라인 생략 ──
+    cached = None
+    if not force:
+        cached = await _find_cached_analysis(db, design_sha256, dev_sha256, selected_pipeline)
+    if cached:
+        analysis.status = "done"
+        analysis.progress_step = "finalize"
+        analysis.similarity_score = cached.similarity_score
+        analysis.marked_image_path = cached.marked_image_path
+        analysis.source_analysis_id = cached.id
+        db.add(analysis)
+        n_diffs = await _clone_differences(db, cached.id, analysis_id)
+        await db.commit()
+        print(f"[Pipeline] 결과 캐시 적중: {analysis_id} ← {cached.id} ({n_diffs}개 차이점 복제)")
+        return {
+            "analysis_id": analysis_id,
+            "status": "done",
+            "pipeline_version": selected_pipeline,
+            "cached": True,
+        }
+
     db.add(analysis)
+    await enqueue_job(db, analysis_id)
     await db.commit()
-
-    background_tasks.add_task(_run_analysis, analysis_id)
-    print(f"[Pipeline] v1_cv 분석 시작: {analysis_id}")
+    print(f"[Pipeline] {selected_pipeline} 분석 대기열 등록: {analysis_id}")
 
     return {
         "analysis_id": analysis_id,
         "status": "pending",
         "pipeline_version": selected_pipeline,
+        "cached": False,
     }
 
 
@@ -577,9 +805,18 @@ async def get_result(analysis_id: str, db: AsyncSession = Depends(get_db)):
         else:
             summary[d.severity] = summary.get(d.severity, 0) + 1
 
-    # 이미지 크기 정보 (프론트엔드 SVG viewBox 매핑용)
-    design_w, design_h = get_image_dimensions(analysis.design_image_path)
-    dev_w, dev_h = get_image_dimensions(analysis.dev_image_path)
+    # 이미지 크기 정보 (프론트엔드 SVG viewBox 매핑용) — 업로드 시 기록된 값 사용
+    if analysis.design_width is None or analysis.dev_width is None:
+        # 메타데이터 컬럼 추가 이전의 분석: 한 번만 헤더를 읽어 채워 넣음
+        design_meta, dev_meta = await asyncio.gather(
+            asyncio.to_thread(probe_image, analysis.design_image_path),
+            asyncio.to_thread(probe_image, analysis.dev_image_path),
+        )
+        _set_image_meta(analysis, "design", design_meta)
+        _set_image_meta(analysis, "dev", dev_meta)
+        await db.commit()
+    design_w, design_h = analysis.design_width, analysis.design_height
+    dev_w, dev_h = analysis.dev_width, analysis.dev_height
 
     return {
         "analysis_id": analysis_id,
@@ -587,9 +824,9 @@ async def get_result(analysis_id: str, db: AsyncSession = Depends(get_db)):
         "similarity_score": analysis.similarity_score,
         "pipeline_version": analysis.pipeline_version,
         "input_mode": analysis.input_mode,
-        "design_image": f"/api/files/{Path(analysis.design_image_path).name}",
-        "dev_image": f"/api/files/{Path(analysis.dev_image_path).name}",
-        "marked_image": f"/api/files/{Path(analysis.marked_image_path).name}" if analysis.marked_image_path else None,
+        "design_image": _file_url(analysis.design_image_path),
+        "dev_image": _file_url(analysis.dev_image_path),
+        "marked_image": _file_url(analysis.marked_image_path) if analysis.marked_image_path else None,
         "design_image_size": {"width": design_w, "height": design_h},
         "dev_image_size": {"width": dev_w, "height": dev_h},
         "summary": summary,
@@ -0,0 +1,55 @@
+"""
+요청 본문 크기 제한 (ASGI 미들웨어).
+
+FastAPI는 핸들러·의존성보다 먼저 multipart 폼 전체를 읽어 임시 파일로 스풀한다.
+그래서 핸들러 안의 크기 검사는 이미 다 받은 뒤에야 동작한다.
+이 미들웨어는 폼 파싱 전에 끼어들어 상한을 강제한다:
+- Content-Length가 상한을 넘으면 본문을 읽지 않고 바로 413
+- 헤더가 없거나 거짓이어도 수신 스트림 누적 바이트가 상한을 넘는 순간 413
+"""
+from __future__ import annotations
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+TOO_LARGE_MESSAGE = "요청이 너무 큽니다. 이미지는 각각 20MB 이하로 올려주세요."
+
+
+class BodySizeLimitMiddleware:
+    """path로 시작하는 경로의 요청 본문을 max_bytes로 제한."""
+
+    def __init__(self, app, path: str, max_bytes: int):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path):
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0  # 잘못된 헤더는 스트림 누적 검사에 맡김
+                if declared > self.max_bytes:
+                    response = JSONResponse({"detail": TOO_LARGE_MESSAGE}, status_code=413)
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # 폼 파싱 중 발생 → FastAPI가 그대로 413 응답으로 변환
+                    raise HTTPException(413, TOO_LARGE_MESSAGE)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -4,10 +4,16 @@ from pathlib import Path
 
 class Settings(BaseSettings):
     gemini_api_key: str = ""
+    gemini_max_concurrency: int = 4  # 동시 Gemini 요청 수 상한
+    gemini_cache_path: str = "./gemini_cache.db"  # Gemini 응답 캐시 (SQLite)
+    gemini_cache_ttl_hours: int = 168  # 캐시 유효 기간 (기본 7일)
+    gemini_cache_max_mb: int = 200  # 캐시 용량 상한, 초과 시 LRU 삭제 (0 = 캐시 끔)
     figma_access_token: str = ""
     database_url: str = "sqlite+aiosqlite:///./designsync.db"
     upload_dir: str = "./uploads"
     frontend_url: str = "http://localhost:3000"
+    compute_workers: int = 0  # CV 프로세스 풀 크기 (0 = CPU 코어 수)
+    embedded_worker: bool = True  # API 프로세스 안에서 분석 워커 실행 (운영: false + python -m app.worker)
 
     class Config:
         env_file = ".env"
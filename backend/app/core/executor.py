@@ -0,0 +1,57 @@
+"""
+CPU 바운드 CV 단계 전용 프로세스 풀.
+
+분석 파이프라인의 이미지 디코딩/SSIM/요소 감지는 수 초씩 CPU를 점유한다.
+uvicorn 이벤트 루프에서 그대로 실행하면 /health, /status 폴링까지 모두 멈추므로
+별도 프로세스 풀에 제출하고 결과만 await 한다.
+"""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _init_worker():
+    """워커 프로세스 초기화 — 무거운 모듈을 미리 import 해 첫 작업 지연을 없앤다."""
+    import cv2  # noqa: F401
+    import skimage.metrics  # noqa: F401
+    import app.services.image_processor  # noqa: F401
+    import app.services.pixel_diff  # noqa: F401
+    import app.services.element_analyzer  # noqa: F401
+
+
+def get_compute_pool() -> ProcessPoolExecutor:
+    """프로세스 풀을 (최초 호출 시) 생성하여 반환. 크기 = 코어 수."""
+    global _pool
+    if _pool is None:
+        workers = settings.compute_workers or os.cpu_count() or 1
+        # spawn: 이벤트 루프/DB 커넥션 스레드를 가진 부모를 fork하지 않도록
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        print(f"[Executor] CV 프로세스 풀 시작: {workers} workers")
+    return _pool
+
+
+def shutdown_compute_pool():
+    """앱 종료 시 프로세스 풀 정리."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def run_cpu(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """CPU 바운드 함수를 프로세스 풀에서 실행하고 결과를 await."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_compute_pool(), partial(fn, *args, **kwargs))
@@ -30,6 +30,18 @@ class Analysis(Base):
     input_mode: Mapped[str] = mapped_column(String, default="screenshot")
     figma_url: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     pipeline_version: Mapped[str] = mapped_column(String, default="v1_cv")
+    # 업로드 시점에 헤더에서 읽은 이미지 메타데이터 (결과 조회 시 파일을 다시 열지 않음)
+    design_width: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    design_height: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    design_format: Mapped[Optional[str]] = mapped_column(String, nullable=True)  # PNG/JPEG/WEBP
+    design_bytes: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    dev_width: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    dev_height: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    dev_format: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    dev_bytes: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    design_sha256: Mapped[Optional[str]] = mapped_column(String, nullable=True, index=True)
+    dev_sha256: Mapped[Optional[str]] = mapped_column(String, nullable=True, index=True)
+    source_analysis_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)  # 결과 캐시에서 복제된 경우 원본 분석
     created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     differences: Mapped[List["Difference"]] = relationship(back_populates="analysis", cascade="all, delete-orphan")
@@ -60,6 +72,35 @@ class Difference(Base):
     analysis: Mapped["Analysis"] = relationship(back_populates="differences")
 
 
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    analysis_id: Mapped[str] = mapped_column(ForeignKey("analyses.id"), index=True)
+    status: Mapped[str] = mapped_column(String, default="queued", index=True)  # queued/leased/done/failed
+    priority: Mapped[int] = mapped_column(Integer, default=0)  # 클수록 먼저 처리
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=3)
+    lease_owner: Mapped[Optional[str]] = mapped_column(String, nullable=True)  # 워커 ID (host:pid)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class Blob(Base):
+    """업로드 이미지 원본 (내용 주소 기반 — 같은 파일은 한 번만 저장)."""
+    __tablename__ = "blobs"
+
+    sha256: Mapped[str] = mapped_column(String, primary_key=True)
+    path: Mapped[str] = mapped_column(String)
+    format: Mapped[str] = mapped_column(String)  # PNG/JPEG/WEBP
+    bytes: Mapped[int] = mapped_column(Integer)
+    ref_count: Mapped[int] = mapped_column(Integer, default=0)  # 이 blob을 가리키는 이미지 경로 수
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
 class ShareLink(Base):
     __tablename__ = "share_links"
 
@@ -95,6 +136,17 @@ async def init_db():
             ("input_mode", "TEXT DEFAULT 'screenshot'"),
             ("figma_url", "TEXT"),
             ("pipeline_version", "TEXT DEFAULT 'v1_cv'"),
+            ("design_width", "INTEGER"),
+            ("design_height", "INTEGER"),
+            ("design_format", "TEXT"),
+            ("design_bytes", "INTEGER"),
+            ("dev_width", "INTEGER"),
+            ("dev_height", "INTEGER"),
+            ("dev_format", "TEXT"),
+            ("dev_bytes", "INTEGER"),
+            ("design_sha256", "TEXT"),
+            ("dev_sha256", "TEXT"),
+            ("source_analysis_id", "TEXT"),
         ]:
             try:
                 await conn.execute(text(
@@ -102,6 +154,11 @@ async def init_db():
                 ))
             except Exception:
                 pass
+        # ALTER TABLE로 추가된 컬럼에는 인덱스가 없으므로 따로 생성
+        for col in ["design_sha256", "dev_sha256"]:
+            await conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_analyses_{col} ON analyses ({col})"
+            ))
 
 
 async def get_db() -> AsyncSession:
@@ -0,0 +1,135 @@
+"""
+순서 보존 DP 정렬 (element_analyzer 매칭 공용).
+
+요소/밴드/존/갭 매칭이 각자 들고 있던 O(n_d·n_v) 파이썬 이중 루프를 하나로 모은 것.
+점화식과 동점 처리는 기존 루프와 같다:
+
+    dp[i][j] = max(dp[i-1][j], dp[i][j-1], dp[i-1][j-1] + score[i-1][j-1])
+    선택: match (dp == 대각 && score >= min_score) → skip_d (dp == 위) → skip_v
+
+행 단위로 계산한다. 위/대각 후보는 벡터 max 한 번, 왼쪽 전파(skip_v 사슬)는
+np.maximum.accumulate로 처리하므로 dp 값이 루프와 비트 단위로 같다.
+역추적 정보는 int8 배열에 담는다.
+
+밴드(허용 쌍 마스크)를 주면 행마다 허용 열을 감싸는 구간만 계산한다.
+구간 왼쪽 열은 윗행 값을 그대로 물려받고, 오른쪽 열은 행 누적 최대값 하나로 표현되므로
+비용이 O(n_d · 밴드 폭)으로 줄어든다. 밴드 밖 쌍은 매칭할 수 없다 (score = -inf와 동일).
+
+    allowed = shift_band(d_y / img_h, v_y / img_h, 0.20)   # 20% 넘게 움직인 쌍 제외
+    pairs = align_ordered(score_matrix, min_score, allowed)  # [(di, vi), ...] 오름차순
+"""
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+SKIP_D = 0
+SKIP_V = 1
+MATCH = 2
+
+
+def shift_band(d_pos: np.ndarray, v_pos: np.ndarray, max_shift: float) -> np.ndarray:
+    """|d_pos - v_pos| <= max_shift인 쌍만 True인 (n_d, n_v) 허용 마스크."""
+    d_pos = np.asarray(d_pos, dtype=np.float64)
+    v_pos = np.asarray(v_pos, dtype=np.float64)
+    return np.abs(d_pos[:, None] - v_pos[None, :]) <= max_shift
+
+
+def _band_windows(allowed: np.ndarray, n_v: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    행별 계산 구간 [lo, hi) (dp 열 번호, 1..n_v).
+
+    허용 열의 처음~끝을 감싸고, lo/hi가 행을 따라 줄지 않도록 넓힌다
+    (구간 밖 열을 "윗행 복사 / 누적 최대"로 표현하기 위한 조건).
+    넓혀서 들어온 비허용 열은 score = -inf로 막으므로 결과에 영향이 없다.
+    """
+    any_row = allowed.any(axis=1)
+    first = np.where(any_row, allowed.argmax(axis=1), n_v - 1)
+    last = np.where(any_row, n_v - 1 - allowed[:, ::-1].argmax(axis=1), 0)
+    lo = np.minimum.accumulate((first + 1)[::-1])[::-1]
+    hi = np.maximum.accumulate(np.maximum(last + 2, lo + 1))
+    return lo, hi
+
+
+def align_ordered(
+    score: np.ndarray,
+    min_score: float,
+    allowed: Optional[np.ndarray] = None,
+) -> List[Tuple[int, int]]:
+    """
+    순서를 보존하며 점수 합이 최대가 되는 매칭 쌍.
+
+    Args:
+        score: (n_d, n_v) 유사도 행렬
+        min_score: 이 점수 미만인 쌍은 매칭으로 채택하지 않음
+        allowed: (n_d, n_v) bool 밴드 마스크 (None이면 전체 허용)
+    Returns: [(design 인덱스, dev 인덱스), ...] 위→아래 순
+    """
+    score = np.asarray(score, dtype=np.float64)
+    n_d, n_v = score.shape
+    if n_d == 0 or n_v == 0:
+        return []
+
+    if allowed is None:
+        lo = np.ones(n_d, dtype=np.int64)
+        hi = np.full(n_d, n_v + 1, dtype=np.int64)
+    else:
+        allowed = np.asarray(allowed, dtype=bool)
+        score = np.where(allowed, score, -np.inf)
+        lo, hi = _band_windows(allowed, n_v)
+
+    # val[j]: 열 j의 윗행 dp 값 (구간 왼쪽으로 밀려난 열은 마지막 값을 그대로 유지)
+    # run_max: 아직 어떤 구간에도 들어오지 않은 열(j >= prev_hi)의 dp 값
+    val = np.zeros(n_v + 1)
+    run_max = 0.0
+    prev_hi = 1
+    offsets = np.zeros(n_d + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(hi - lo)
+    choice = np.empty(int(offsets[-1]), dtype=np.int8)
+    right_skip_d = np.zeros(n_d, dtype=bool)  # 구간 오른쪽 열의 선택 (True: skip_d)
+
+    for i in range(n_d):
+        l, h = int(lo[i]), int(hi[i])
+        if prev_hi < h:
+            val[prev_hi:h] = run_max  # 처음 닿는 열 (구간이 건너뛴 열 포함)
+            prev_hi = h
+        prev = val[l - 1:h].copy()
+
+        s = score[i, l - 1:h - 1]
+        skip_d = prev[1:]
+        match_s = prev[:-1] + s
+        best = np.maximum(skip_d, match_s)
+        np.maximum.accumulate(best, out=best)
+        np.maximum(best, prev[0], out=best)  # 왼쪽 이웃 dp[i][l-1] = 윗행 값
+
+        row_choice = np.where(best == skip_d, SKIP_D, SKIP_V).astype(np.int8)
+        row_choice[(best == match_s) & (s >= min_score)] = MATCH
+        choice[offsets[i]:offsets[i + 1]] = row_choice
+
+        edge = float(best[-1])
+        right_skip_d[i] = run_max >= edge
+        run_max = max(run_max, edge)
+        val[l:h] = best
+
+    # 역추적
+    pairs: List[Tuple[int, int]] = []
+    di, vi = n_d, n_v
+    while di > 0 and vi > 0:
+        i = di - 1
+        if vi < lo[i]:
+            step = SKIP_D
+        elif vi >= hi[i]:
+            step = SKIP_D if right_skip_d[i] else SKIP_V
+        else:
+            step = choice[offsets[i] + vi - lo[i]]
+        if step == MATCH:
+            pairs.append((di - 1, vi - 1))
+            di -= 1
+            vi -= 1
+        elif step == SKIP_D:
+            di -= 1
+        else:
+            vi -= 1
+    pairs.reverse()
+    return pairs
@@ -0,0 +1,174 @@
+"""
+바운딩 박스 공간 인덱스 (균일 격자).
+
+pixel_diff / analyze.py의 영역 후처리(커버 판정, IoU 병합, 중복 제거)가
+모든 쌍을 비교하던 O(n²) 스캔을, 같은 격자 셀을 공유하는 박스끼리만 비교하도록 바꾼다.
+박스는 (x, y, w, h) 튜플, 교차 판정은 기존 코드와 같이 "양의 넓이로 겹칠 때"만 참.
+
+    index = BBoxIndex()
+    i = index.insert((x, y, w, h))
+    index.max_coverage((qx, qy, qw, qh))   # 쿼리 박스가 기존 박스에 덮인 최대 비율
+    index.intersecting(box)                  # 겹치는 박스 id (삽입 순)
+    index.nearest(x, y, max_dist)            # 점에서 가장 가까운 박스
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+Box = Tuple[int, int, int, int]  # (x, y, w, h)
+
+DEFAULT_CELL_SIZE = 64
+
+
+def intersection_area(a: Box, b: Box) -> int:
+    """두 박스의 교집합 넓이 (겹치지 않으면 0)."""
+    ix1 = max(a[0], b[0])
+    iy1 = max(a[1], b[1])
+    ix2 = min(a[0] + a[2], b[0] + b[2])
+    iy2 = min(a[1] + a[3], b[1] + b[3])
+    if ix2 <= ix1 or iy2 <= iy1:
+        return 0
+    return (ix2 - ix1) * (iy2 - iy1)
+
+
+def iou(a: Box, b: Box) -> float:
+    """두 bbox의 IoU (Intersection over Union)."""
+    intersection = intersection_area(a, b)
+    if intersection == 0:
+        return 0.0
+    union = a[2] * a[3] + b[2] * b[3] - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+class BBoxIndex:
+    """
+    균일 격자 기반 박스 인덱스.
+
+    각 박스는 자신이 걸친 모든 셀에 등록된다. 넓이가 0 이하인 박스는 (어떤 박스와도
+    교차하지 않지만 nearest 질의를 위해) 시작점이 속한 셀 하나에만 등록된다.
+    id는 삽입 순서(0, 1, 2, ...)이며 질의 결과도 id 오름차순이라 기존 순차 스캔의
+    "먼저 나온 것 우선" 규칙을 그대로 재현할 수 있다.
+    """
+
+    def __init__(self, cell_size: int = DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self._boxes: List[Box] = []
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def box(self, item_id: int) -> Box:
+        return self._boxes[item_id]
+
+    def _cell_range(self, box: Box) -> Tuple[range, range]:
+        x, y, w, h = box
+        c = self.cell_size
+        return (
+            range(x // c, (x + max(w, 1) - 1) // c + 1),
+            range(y // c, (y + max(h, 1) - 1) // c + 1),
+        )
+
+    def _register(self, item_id: int, box: Box):
+        cols, rows = self._cell_range(box)
+        for cy in rows:
+            for cx in cols:
+                self._cells.setdefault((cx, cy), []).append(item_id)
+
+    def _unregister(self, item_id: int, box: Box):
+        cols, rows = self._cell_range(box)
+        for cy in rows:
+            for cx in cols:
+                self._cells[(cx, cy)].remove(item_id)
+
+    def insert(self, box: Box) -> int:
+        """박스 추가. Returns: id"""
+        box = tuple(int(v) for v in box)
+        item_id = len(self._boxes)
+        self._boxes.append(box)
+        self._register(item_id, box)
+        return item_id
+
+    def update(self, item_id: int, box: Box):
+        """id의 박스를 교체 (다른 셀로 옮겨 등록)."""
+        box = tuple(int(v) for v in box)
+        self._unregister(item_id, self._boxes[item_id])
+        self._boxes[item_id] = box
+        self._register(item_id, box)
+
+    def candidates(self, box: Box) -> List[int]:
+        """box가 걸친 셀에 등록된 id (중복 제거, 오름차순) — 정밀 판정 전 후보."""
+        cols, rows = self._cell_range(box)
+        found = set()
+        for cy in rows:
+            for cx in cols:
+                found.update(self._cells.get((cx, cy), ()))
+        return sorted(found)
+
+    def intersecting(self, box: Box) -> List[int]:
+        """box와 양의 넓이로 겹치는 박스 id (오름차순)."""
+        if box[2] <= 0 or box[3] <= 0:
+            return []
+        return [i for i in self.candidates(box) if intersection_area(box, self._boxes[i]) > 0]
+
+    def max_coverage(self, box: Box) -> float:
+        """box가 단일 기존 박스에 덮인 최대 비율 (교집합 / box 넓이)."""
+        if box[2] <= 0 or box[3] <= 0:
+            return 0.0
+        area = box[2] * box[3]
+        best = 0.0
+        for i in self.candidates(box):
+            inter = intersection_area(box, self._boxes[i])
+            if inter:
+                best = max(best, inter / area)
+        return best
+
+    def nearest(self, x: float, y: float, max_dist: float) -> Optional[Tuple[int, float]]:
+        """
+        점 (x, y)에서 max_dist 이내의 가장 가까운 박스 (점이 박스 안이면 거리 0).
+
+        Returns: (id, 거리) 또는 None. 거리가 같으면 id가 작은 것.
+        """
+        r = max(0, int(math.ceil(max_dist)))
+        search = (int(math.floor(x)) - r, int(math.floor(y)) - r, 2 * r + 1, 2 * r + 1)
+        best: Optional[Tuple[int, float]] = None
+        for i in self.candidates(search):
+            bx, by, bw, bh = self._boxes[i]
+            dx = max(bx - x, 0, x - (bx + max(bw, 0)))
+            dy = max(by - y, 0, y - (by + max(bh, 0)))
+            dist = math.hypot(dx, dy)
+            if dist <= max_dist and (best is None or dist < best[1]):
+                best = (i, dist)
+        return best
+
+
+def merge_groups_by_iou(
+    boxes: Iterable[Box], threshold: float, cell_size: int = DEFAULT_CELL_SIZE,
+) -> List[List[int]]:
+    """
+    순서대로 훑으며 IoU > threshold인 뒤쪽 박스를 앞 박스 그룹에 흡수 (탐욕 병합).
+
+    기존 이중 루프와 같은 의미: 그룹 기준은 첫 박스의 원래 bbox이며,
+    이미 다른 그룹에 들어간 박스는 다시 쓰지 않는다. 그룹 내 id는 오름차순.
+    """
+    boxes = list(boxes)
+    index = BBoxIndex(cell_size)
+    for b in boxes:
+        index.insert(b)
+
+    groups: List[List[int]] = []
+    used = set()
+    for i, a in enumerate(boxes):
+        if i in used:
+            continue
+        group = [i]
+        for j in index.intersecting(a):
+            if j <= i or j in used:
+                continue
+            if iou(a, boxes[j]) > threshold:
+                group.append(j)
+                used.add(j)
+        used.add(i)
+        groups.append(group)
+    return groups
@@ -0,0 +1,69 @@
+"""
+내용 주소 기반(content-addressed) 업로드 이미지 저장소.
+
+같은 디자인 시안이 여러 개발 빌드와 반복 비교되므로, 업로드 파일은 SHA-256으로
+식별해 한 번만 저장하고 Analysis는 공유 blob 경로를 가리킨다.
+
+    UPLOAD_PATH/blobs/ab/cd/abcd…ef.png   (해시 앞 2+2자리로 디렉토리 분산)
+
+blobs 테이블의 ref_count는 이 파일을 가리키는 이미지 경로 수다 (분석 삭제 기능이
+없으므로 blob은 지우지 않고, 정리 작업이 참고할 수 있도록 기록만 한다).
+
+해시가 정해지기 전의 업로드는 TMP_DIR에 받는다. UPLOAD_PATH는 /api/files로 공개
+서빙되므로 그 밖의 형제 디렉토리를 쓴다 (같은 파일시스템 → blob으로 원자적 이동).
+"""
+from __future__ import annotations
+
+import os
+import uuid
+from pathlib import Path
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import UPLOAD_PATH
+from app.models.database import Blob
+
+BLOB_DIR = UPLOAD_PATH / "blobs"
+TMP_DIR = UPLOAD_PATH.parent / f"{UPLOAD_PATH.name}_tmp"  # 저장 중인 업로드 (정적 서빙 밖)
+
+FORMAT_EXT = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp"}
+
+
+def new_temp_path() -> Path:
+    """업로드를 스트리밍할 임시 파일 경로."""
+    TMP_DIR.mkdir(parents=True, exist_ok=True)
+    return TMP_DIR / f"{uuid.uuid4().hex}.part"
+
+
+def blob_path(sha256: str, fmt: str) -> Path:
+    """해시 → 샤딩된 blob 경로."""
+    return BLOB_DIR / sha256[:2] / sha256[2:4] / f"{sha256}{FORMAT_EXT.get(fmt, '')}"
+
+
+async def store_blob(db: AsyncSession, tmp_path: Path, sha256: str, fmt: str) -> str:
+    """
+    임시 파일을 blob으로 등록하고 참조 수를 1 올린 뒤 blob 경로를 반환.
+
+    이미 같은 내용이 있으면 임시 파일만 지운다. 커밋은 호출 측 세션에서
+    Analysis와 함께 수행.
+    """
+    dest = blob_path(sha256, fmt)
+    if dest.exists():
+        tmp_path.unlink(missing_ok=True)
+    else:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, dest)  # 같은 파일시스템 내 원자적 이동
+
+    size = dest.stat().st_size
+    # 동시에 같은 파일이 올라와도 행 1개에 참조 수만 누적 (SQLite upsert)
+    await db.execute(
+        insert(Blob)
+        .values(sha256=sha256, path=str(dest), format=fmt, bytes=size, ref_count=1)
+        .on_conflict_do_update(
+            index_elements=[Blob.sha256],
+            set_={"ref_count": Blob.ref_count + 1},
+        )
+    )
+    return str(dest)
+
@@ -37,9 +37,12 @@ from __future__ import annotations
 
 import cv2
 import numpy as np
-from typing import List, Dict, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Tuple, Optional
 from skimage.metrics import structural_similarity as ssim
 
+from app.services.alignment import align_ordered, shift_band
+
 # ═══════════════════════════════════════════════════════════
 # 설정 상수
 # ═══════════════════════════════════════════════════════════
@@ -60,6 +63,30 @@ STRUCTURAL_SIMILARITY_GATE = 0.25  # 이 이하면 "구조적으로 다른 화
 ANCHOR_BG_TRANSITION_THRESH = 30   # 배경색 전환 감지 임계값 (RGB 거리)
 ANCHOR_MIN_ZONE_H = 20            # 최소 존 높이 (px)
 
+# 콘텐츠 감지 배경 추정 (대형 medianBlur)
+# "exact":  원본 해상도 medianBlur (기준)
+# "approx": 1/BG_MEDIAN_SCALE 간격으로 샘플링 → 줄인 커널로 median → bilinear 확대
+#           (3MP 스크린샷 기준 약 10배 이상 빠름, 일치율은 python -m app.tools.validate_bg_median)
+BG_MEDIAN_MODE = "exact"
+BG_MEDIAN_SCALE = 4
+
+# 요소 매칭 DP 밴드 (화면 높이 비율). center_y가 이보다 멀리 떨어진 쌍은 매칭 후보에서 제외해
+# DP를 O(n·밴드 폭)으로 줄인다. 0.20 = _compare_element_diffs의 y_dist 필터와 같은 기준 —
+# 어차피 버려질 쌍이 DP에서 정상 쌍 자리를 빼앗지 못하게 하는 효과도 있다.
+# None이면 밴드 없이 전체 DP.
+ELEMENT_MATCH_BAND: Optional[float] = 0.20
+
+# 요소 매칭 SSIM 크롭 검증
+SSIM_WIN_SIZE = 7      # skimage structural_similarity 기본 창 크기
+SSIM_BATCH_SIZE = 8    # 캔버스 하나에 이어 붙일 크롭 쌍 수 (캐시에 들어가는 크기가 가장 빠름)
+
+# 디자인/개발 이미지별 특징 추출(밴드·상태바·요소 감지)을 스레드 2개로 동시에 실행
+# (medianBlur/Canny/연결 컴포넌트 등 OpenCV·numpy 연산은 GIL을 놓음).
+# False면 순차 실행 — 두 이미지의 로그가 섞이지 않아 디버깅할 때 편함.
+PARALLEL_IMAGE_FEATURES = True
+
+_feature_pool: Optional[ThreadPoolExecutor] = None
+
 
 # ═══════════════════════════════════════════════════════════
 # 적응형 콘텐츠 감지 (v5.2: 픽셀 단위 배경 추정)
@@ -87,22 +114,90 @@ def _compute_adaptive_content(
 
     Returns: 2D boolean content mask, shape (h, w)
     """
-    h, w = gray.shape
+    return _ImageFeatures(gray=gray).content(bg_diff_thresh, canny_low, canny_high)
+
+
+class _ImageFeatures:
+    """
+    이미지 1장의 콘텐츠 감지 중간 결과 메모 캐시 (detect_and_compare 1회 동안 유지).
 
-    # 배경 추정: 대형 median blur (텍스트/아이콘을 제거하고 배경만 남김)
-    # ksize > 가장 큰 UI 요소(아이콘 ~60px, 버튼 ~60px)보다 커야 함
-    # 너무 작으면 아이콘 채우기가 배경으로 인식되어 감지 실패
-    ksize = max(91, (min(h, w) // 4) | 1)  # 홀수 보장, 최소 91
-    local_bg = cv2.medianBlur(gray, ksize).astype(np.float32)
+    _compute_adaptive_content의 비싼 부분인 대형 medianBlur 배경 추정과 Canny는
+    임계값과 무관하게 이미지에만 의존하므로 한 번씩만 계산하고, 파라미터 조합별
+    콘텐츠 마스크는 거기에 임계값만 다시 적용해 만든다.
+    content()가 돌려주는 마스크는 호출 측끼리 공유되므로 읽기 전용 — 수정하려면 copy.
+    """
 
-    # 콘텐츠: 로컬 배경에서 충분히 다른 픽셀
-    diff_from_bg = np.abs(gray.astype(np.float32) - local_bg)
-    content_mask = diff_from_bg > bg_diff_thresh
+    def __init__(
+        self,
+        img: Optional[np.ndarray] = None,
+        gray: Optional[np.ndarray] = None,
+        bg_mode: Optional[str] = None,
+    ):
+        self.img = img
+        self.bg_mode = bg_mode or BG_MEDIAN_MODE
+        self._gray = gray
+        self._diff_from_bg: Optional[np.ndarray] = None
+        self._edges: Dict[Tuple[int, int], np.ndarray] = {}
+        self._content: Dict[Tuple[int, int, int], np.ndarray] = {}
+
+    @property
+    def gray(self) -> np.ndarray:
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.img, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def diff_from_bg(self) -> np.ndarray:
+        """각 픽셀과 로컬 배경(대형 median blur)의 밝기 차 (uint8 — 정수라 float 차와 같은 값)."""
+        if self._diff_from_bg is None:
+            gray = self.gray
+            h, w = gray.shape
+            # 배경 추정: 대형 median blur (텍스트/아이콘을 제거하고 배경만 남김)
+            # ksize > 가장 큰 UI 요소(아이콘 ~60px, 버튼 ~60px)보다 커야 함
+            # 너무 작으면 아이콘 채우기가 배경으로 인식되어 감지 실패
+            ksize = max(91, (min(h, w) // 4) | 1)  # 홀수 보장, 최소 91
+            local_bg = _estimate_background(gray, ksize, self.bg_mode)
+            self._diff_from_bg = cv2.absdiff(gray, local_bg)
+        return self._diff_from_bg
+
+    def edges(self, canny_low: int, canny_high: int) -> np.ndarray:
+        key = (canny_low, canny_high)
+        if key not in self._edges:
+            self._edges[key] = cv2.Canny(self.gray, canny_low, canny_high) > 0
+        return self._edges[key]
+
+    def content(
+        self, bg_diff_thresh: int = 18, canny_low: int = 25, canny_high: int = 80,
+    ) -> np.ndarray:
+        """_compute_adaptive_content와 같은 콘텐츠 마스크 (파라미터 조합별 1회 계산)."""
+        key = (bg_diff_thresh, canny_low, canny_high)
+        if key not in self._content:
+            # 콘텐츠: 로컬 배경에서 충분히 다른 픽셀 + Canny 에지 보완 (배경 무관, 미세 구조 감지)
+            mask = (self.diff_from_bg > bg_diff_thresh) | self.edges(canny_low, canny_high)
+            mask.flags.writeable = False
+            self._content[key] = mask
+        return self._content[key]
+
+
+def _estimate_background(gray: np.ndarray, ksize: int, mode: str = "exact") -> np.ndarray:
+    """
+    ksize×ksize median으로 로컬 배경 추정 (uint8).
 
-    # Canny 에지 보완 (배경 무관, 미세 구조 감지)
-    edges = cv2.Canny(gray, canny_low, canny_high)
+    approx: BG_MEDIAN_SCALE 간격 샘플(INTER_NEAREST)에 ksize/scale 커널 median 후
+    bilinear 확대. 평균 축소(INTER_AREA)는 텍스트와 배경을 섞어 median이 흐려지므로
+    샘플링을 쓴다. 배경은 완만하게 변해서 확대 오차는 경계 근처 몇 px에 그친다.
+    """
+    if mode == "exact":
+        return cv2.medianBlur(gray, ksize)
+    if mode != "approx":
+        raise ValueError(f"알 수 없는 BG_MEDIAN_MODE: {mode}")
 
-    return content_mask | (edges > 0)
+    h, w = gray.shape
+    scale = BG_MEDIAN_SCALE
+    small = cv2.resize(gray, (-(-w // scale), -(-h // scale)), interpolation=cv2.INTER_NEAREST)
+    small_k = max(3, (ksize // scale) | 1)
+    small_bg = cv2.medianBlur(small, small_k)
+    return cv2.resize(small_bg, (w, h), interpolation=cv2.INTER_LINEAR)
 
 
 def _detect_status_bar_boundary(img: np.ndarray) -> int:
@@ -139,28 +234,17 @@ def _detect_status_bar_boundary(img: np.ndarray) -> int:
         return fallback
 
     # 가장 아래쪽의 강한 수평 에지 = 상태바/헤더 하단 경계
-    candidates = []
-    for y in range(min_y, scan_limit):
-        if row_edge[y] >= threshold:
-            candidates.append(y)
+    candidates = min_y + np.flatnonzero(row_edge[min_y:scan_limit] >= threshold)
 
-    if not candidates:
+    if candidates.size == 0:
         return fallback
 
-    # 연속된 에지 클러스터 중 가장 아래쪽 클러스터의 하단
-    clusters = []
-    cluster_start = candidates[0]
-    prev = candidates[0]
-    for y in candidates[1:]:
-        if y - prev > 5:  # 5px 이상 떨어지면 새 클러스터
-            clusters.append((cluster_start, prev))
-            cluster_start = y
-        prev = y
-    clusters.append((cluster_start, prev))
-
+    # 연속된 에지 클러스터 (5px 이상 떨어지면 새 클러스터)
     # 첫 번째 강한 에지 클러스터 = 상태바 하단 경계
     # (두 번째는 네비게이션 바일 수 있으므로 첫 번째만)
-    boundary = clusters[0][1] + 1
+    split = _first_true(np.diff(candidates) > 5)
+    first_cluster_end = candidates[split] if split is not None else candidates[-1]
+    boundary = int(first_cluster_end) + 1
 
     # 안전 범위: 3% ~ 10% 사이만 허용
     min_cutoff = int(h * 0.03)
@@ -188,9 +272,65 @@ def _trim_status_bar(bands: List[Dict], cutoff: int) -> List[Dict]:
     return result
 
 
+def _get_feature_pool() -> ThreadPoolExecutor:
+    global _feature_pool
+    if _feature_pool is None:
+        _feature_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="features")
+    return _feature_pool
+
+
+def _run_per_image(fn: Callable, design_args: tuple, dev_args: tuple) -> Tuple:
+    """fn을 디자인/개발 인자로 각각 실행 (PARALLEL_IMAGE_FEATURES면 개발 쪽은 풀 스레드에서 동시에)."""
+    if not PARALLEL_IMAGE_FEATURES:
+        return fn(*design_args), fn(*dev_args)
+    dev_future = _get_feature_pool().submit(fn, *dev_args)
+    return fn(*design_args), dev_future.result()
+
+
+def _detect_image_bands(
+    img: np.ndarray, img_w: int, img_h: int, label: str,
+) -> Tuple[_ImageFeatures, List[Dict], int]:
+    """
+    이미지 1장의 특징 추출 1단계: 밴드 감지 + 상태바 경계 후보.
+
+    Returns: (features, bands, status_cutoff 후보)
+    """
+    # 배경 추정(medianBlur)/Canny는 이미지당 한 번만 — 밴드 감지·경계 보정·요소 감지가 공유
+    features = _ImageFeatures(img)
+    bands = _detect_content_bands(img, img_w, img_h, label, features=features)
+    cutoff = _detect_status_bar_boundary(img)
+    return features, bands, cutoff
+
+
+def _extract_image_structure(
+    img: np.ndarray,
+    features: _ImageFeatures,
+    bands: List[Dict],
+    status_cutoff: int,
+    img_w: int,
+    img_h: int,
+    label: str,
+    detect_elements: bool,
+) -> Tuple[List[Dict], Optional[ElementSet]]:
+    """
+    이미지 1장의 특징 추출 2단계 (양쪽 공통 status_cutoff 확정 후):
+    대형 밴드 하위 분해 → 밴드 경계 보정 → (detect_elements면) UI 요소 감지.
+
+    bands는 이미 _trim_status_bar를 거친 것.
+    Returns: (bands, elements 또는 None)
+    """
+    bands = _decompose_large_bands(bands, img, img_w, img_h, label)
+    bands = _refine_band_edges(bands, img, features=features)
+    elements = None
+    if detect_elements:
+        elements = _detect_ui_elements(img, exclude_top=status_cutoff, features=features)
+    return bands, elements
+
+
 def detect_and_compare(
-    design_path: str,
-    dev_path: str,
+    design_crop: np.ndarray,
+    dev_crop: np.ndarray,
+    design_size: Tuple[int, int],
 ) -> Tuple[List[Dict], List[Dict], List[Dict]]:
     """
     두 이미지의 UI 구조를 감지하고 간격을 비교한다.
@@ -200,28 +340,18 @@ def detect_and_compare(
     2. 구조적 앵커 감지: 배경색 전환점 (콘텐츠 무관)
     3. 앵커 기반 존 매칭 → 존 내부 비교
 
+    Args:
+        design_crop, dev_crop: ImageContext.aligned() 결과 (BGR, dev 너비·공통 높이)
+        design_size: 원본 디자인 (width, height) — 로그용
+
     Returns:
         (differences, design_bands, dev_bands)
     """
-    design = cv2.imread(design_path)
-    dev = cv2.imread(dev_path)
-
-    if design is None or dev is None:
-        print("[ElementAnalyzer] 이미지 로드 실패")
-        return [], [], []
-
-    # ── Step 1: 스마트 정규화 ──
-    target_w = dev.shape[1]
-    if design.shape[1] != target_w:
-        scale = target_w / design.shape[1]
-        new_h = int(design.shape[0] * scale)
-        design = cv2.resize(design, (target_w, new_h), interpolation=cv2.INTER_LANCZOS4)
-        print(f"[ElementAnalyzer] 디자인 리사이즈: {design.shape[1]}×{design.shape[0]}")
-
-    compare_h = min(design.shape[0], dev.shape[0])
-    design_crop = design[:compare_h]
-    dev_crop = dev[:compare_h]
-    target_h = compare_h
+    # ── Step 1: 스마트 정규화 (디자인 → dev 너비, 공통 높이) — 호출 측에서 완료 ──
+    target_h, target_w = dev_crop.shape[:2]
+    if design_size[0] != target_w:
+        print(f"[ElementAnalyzer] 디자인 리사이즈: {target_w}×"
+              f"{int(design_size[1] * target_w / design_size[0])}")
 
     print(f"[ElementAnalyzer] 비교 영역: {target_w}×{target_h}")
 
@@ -236,14 +366,16 @@ def detect_and_compare(
         print(f"[ElementAnalyzer] ⚠ 구조적 유사도 낮음 ({structural_sim:.3f}) "
               f"→ 요소 단위 매칭 건너뜀 (오탐 방지)")
 
-    # ── Step 2: 밴드 감지 ──
-    design_bands = _detect_content_bands(design_crop, target_w, target_h, "design")
-    dev_bands = _detect_content_bands(dev_crop, target_w, target_h, "dev")
+    # 디자인/개발은 상태바 cutoff(양쪽 최소값) 외에는 서로 독립 → 두 단계로 나눠 동시에 실행
+    # ── Step 2: 밴드 감지 + Step 3: 상태바 경계 감지 (v11: edge detection 기반) ──
+    (design_feat, design_bands, design_cutoff), (dev_feat, dev_bands, dev_cutoff) = _run_per_image(
+        _detect_image_bands,
+        (design_crop, target_w, target_h, "design"),
+        (dev_crop, target_w, target_h, "dev"),
+    )
 
-    # ── Step 3: 상태바 제외 (v11: edge detection 기반) ──
+    # ── Step 3: 상태바 제외 ──
     # 디자인/개발 각각에서 상태바 경계 감지 후 더 보수적인 값 사용
-    design_cutoff = _detect_status_bar_boundary(design_crop)
-    dev_cutoff = _detect_status_bar_boundary(dev_crop)
     status_cutoff = min(design_cutoff, dev_cutoff)  # 더 짧은 쪽 기준 (안전)
     design_bands = _trim_status_bar(design_bands, status_cutoff)
     dev_bands = _trim_status_bar(dev_bands, status_cutoff)
@@ -251,15 +383,16 @@ def detect_and_compare(
           f"design={design_cutoff}, dev={dev_cutoff}) 후: "
           f"디자인 {len(design_bands)}개, 개발 {len(dev_bands)}개")
 
-    # ── Step 3.5: 대형 밴드 하위 분해 ──
-    design_bands = _decompose_large_bands(design_bands, design_crop, target_w, target_h, "design")
-    dev_bands = _decompose_large_bands(dev_bands, dev_crop, target_w, target_h, "dev")
+    # ── Step 3.5: 대형 밴드 하위 분해 + Step 3.6: 밴드 경계 정밀 보정 (v4) + 요소 감지 ──
+    (design_bands, design_elements), (dev_bands, dev_elements) = _run_per_image(
+        _extract_image_structure,
+        (design_crop, design_feat, design_bands, status_cutoff, target_w, target_h, "design",
+         not skip_element_matching),
+        (dev_crop, dev_feat, dev_bands, status_cutoff, target_w, target_h, "dev",
+         not skip_element_matching),
+    )
     print(f"[ElementAnalyzer] 하위 분해 후: 디자인 {len(design_bands)}개, 개발 {len(dev_bands)}개")
 
-    # ── Step 3.6: 밴드 경계 정밀 보정 (v4) ──
-    design_bands = _refine_band_edges(design_bands, design_crop)
-    dev_bands = _refine_band_edges(dev_bands, dev_crop)
-
     # ══════════════════════════════════════════════
     # v10: 구조 게이트 → 요소 단위 비교 (어젯밤 v8/v9 그대로)
     # ══════════════════════════════════════════════
@@ -277,8 +410,6 @@ def detect_and_compare(
         # 갭 감지는 콘텐츠 의존적 (언어 변경 → 줄바꿈 → 갭 위치 변동 → 오매칭)
         # 세밀 요소 매칭(kh=2)이 수직 간격 + 마진 + 높이 + 너비 모두 측정 가능
 
-        design_elements = _detect_ui_elements(design_crop, exclude_top=status_cutoff)
-        dev_elements = _detect_ui_elements(dev_crop, exclude_top=status_cutoff)
         print(f"[ElementAnalyzer] 요소 감지: 디자인 {len(design_elements)}개, "
               f"개발 {len(dev_elements)}개")
 
@@ -556,67 +687,35 @@ def _match_zones(
     """
     존을 배경색 유사도 + 상대 위치로 매칭 (DP 순서 보존).
     """
-    n_d = len(d_zones)
-    n_v = len(v_zones)
+    if not d_zones or not v_zones:
+        return []
 
     # 배경색 계산
     d_colors = [_zone_bg_color(design_img, z) for z in d_zones]
     v_colors = [_zone_bg_color(dev_img, z) for z in v_zones]
 
-    # 유사도 매트릭스
-    score_matrix = np.zeros((n_d, n_v))
-    for di in range(n_d):
-        for vi in range(n_v):
-            # 배경색 유사도 (RGB 거리 → 0~1)
-            color_dist = float(np.linalg.norm(d_colors[di] - v_colors[vi]))
-            color_sim = max(0.0, 1.0 - color_dist / 200.0)
+    # 유사도 매트릭스 (n_d × n_v 브로드캐스트)
+    # 배경색 유사도 (RGB 거리 → 0~1)
+    # 쌍별 np.linalg.norm(float32 dot)과 같은 값이 나오도록 배치 행렬곱으로 제곱합
+    color_diff = np.array(d_colors)[:, None, :] - np.array(v_colors)[None, :, :]
+    color_dist = np.sqrt(color_diff[..., None, :] @ color_diff[..., :, None])[..., 0, 0].astype(np.float64)
+    color_sim = np.maximum(0.0, 1.0 - color_dist / 200.0)
 
-            # 상대 위치 유사도
-            d_rel = d_zones[di]["center_y"] / img_h
-            v_rel = v_zones[vi]["center_y"] / img_h
-            pos_sim = max(0.0, 1.0 - abs(d_rel - v_rel) * 4)
+    # 상대 위치 유사도
+    pos_sim = _position_sim(d_zones, v_zones, "center_y", img_h, 4)
 
-            # 높이 비율 유사도
-            h_ratio = min(d_zones[di]["height"], v_zones[vi]["height"]) / \
-                      max(d_zones[di]["height"], v_zones[vi]["height"], 1)
+    # 높이 비율 유사도
+    h_ratio = _size_ratio(d_zones, v_zones, "height")
 
-            # 결합: 배경색 50% + 위치 30% + 높이 20%
-            score_matrix[di, vi] = color_sim * 0.50 + pos_sim * 0.30 + h_ratio * 0.20
+    # 결합: 배경색 50% + 위치 30% + 높이 20%
+    score_matrix = color_sim * 0.50 + pos_sim * 0.30 + h_ratio * 0.20
 
     # DP 순서 보존 매칭
     MIN_ZONE_SCORE = 0.35
-    dp = np.zeros((n_d + 1, n_v + 1))
-    choice = [[None] * (n_v + 1) for _ in range(n_d + 1)]
-
-    for di in range(1, n_d + 1):
-        for vi in range(1, n_v + 1):
-            skip_d = dp[di - 1][vi]
-            skip_v = dp[di][vi - 1]
-            match_s = dp[di - 1][vi - 1] + score_matrix[di - 1][vi - 1]
-
-            best = max(skip_d, skip_v, match_s)
-            dp[di][vi] = best
-
-            if best == match_s and score_matrix[di - 1][vi - 1] >= MIN_ZONE_SCORE:
-                choice[di][vi] = "match"
-            elif best == skip_d:
-                choice[di][vi] = "skip_d"
-            else:
-                choice[di][vi] = "skip_v"
-
-    # 역추적
-    matches = []  # type: List[Tuple[int, int, float]]
-    di, vi = n_d, n_v
-    while di > 0 and vi > 0:
-        if choice[di][vi] == "match":
-            matches.append((di - 1, vi - 1, float(score_matrix[di - 1][vi - 1])))
-            di -= 1
-            vi -= 1
-        elif choice[di][vi] == "skip_d":
-            di -= 1
-        else:
-            vi -= 1
-    matches.reverse()
+    matches = [
+        (di, vi, float(score_matrix[di][vi]))
+        for di, vi in align_ordered(score_matrix, MIN_ZONE_SCORE)
+    ]  # type: List[Tuple[int, int, float]]
 
     for d_i, v_i, sc in matches:
         print(f"    존매칭: D[{d_i}](y={d_zones[d_i]['y_start']}~{d_zones[d_i]['y_end']}) "
@@ -788,18 +887,83 @@ def _merge_anchor_and_element_diffs(
 # 밴드 감지 (v2: 강화된 임계값 + 노이즈 필터링)
 # ═══════════════════════════════════════════════════════════
 
+def _true_runs(mask: np.ndarray, min_len: int = 1) -> List[Tuple[int, int]]:
+    """1D bool 배열에서 길이 min_len 이상인 True 구간 [(start, end), ...] (run-length)."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    keep = ends - starts >= min_len
+    return list(zip(starts[keep].tolist(), ends[keep].tolist()))
+
+
+def _first_true(mask: np.ndarray) -> Optional[int]:
+    """1D bool 배열의 첫 True 인덱스 (없으면 None)."""
+    if mask.size == 0:
+        return None
+    idx = int(np.argmax(mask))
+    return idx if mask[idx] else None
+
+
+def _mask_density(mask: np.ndarray, axis: int) -> np.ndarray:
+    """
+    bool 마스크의 축별 콘텐츠 비율 (float32).
+
+    np.mean(mask.astype(np.float32), axis)와 비트 단위로 같다 — 0/1 합은 float32로
+    정확하고 나눗셈도 float32라서. float32 사본 없이 cv2.reduce로 개수만 센다.
+    """
+    counts = cv2.reduce(mask.view(np.uint8), axis, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel()
+    return counts.astype(np.float32) / np.float32(mask.shape[axis])
+
+
+def _extract_bands(
+    combined: np.ndarray, is_content: np.ndarray, min_band_h: int, min_gap_h: int,
+) -> List[Dict]:
+    """
+    행별 콘텐츠 판정(is_content)에서 밴드 추출 → 가까운 밴드 병합 → 마진/밀도 측정.
+
+    min_band_h 미만의 콘텐츠 구간은 버리고, 남은 밴드 사이 간격이 min_gap_h 미만이면 합친다.
+    """
+    merged: List[Dict] = []
+    for start, end in _true_runs(is_content, min_band_h):
+        if merged and start - merged[-1]["y_end"] < min_gap_h:
+            merged[-1]["y_end"] = end
+        else:
+            merged.append({"y_start": start, "y_end": end})
+
+    w = combined.shape[1]
+    for band in merged:
+        y1, y2 = band["y_start"], band["y_end"]
+        band["height"] = y2 - y1
+        band["center_y"] = (y1 + y2) // 2
+
+        band_content = combined[y1:y2, :]
+        v_proj = _mask_density(band_content, axis=0)
+        content_cols = v_proj > 0.03  # v1: 0.02
+
+        left = _first_true(content_cols)
+        right = _first_true(content_cols[::-1])
+        band["left_margin"] = left if left is not None else 0
+        band["right_margin"] = right if right is not None else 0
+
+        band["content_width"] = w - band["left_margin"] - band["right_margin"]
+        band["density"] = float(np.mean(band_content))
+
+    return merged
+
+
 def _detect_content_bands(
-    img: np.ndarray, img_w: int, img_h: int, label: str = ""
+    img: np.ndarray, img_w: int, img_h: int, label: str = "",
+    features: Optional[_ImageFeatures] = None,
 ) -> List[Dict]:
     """Horizontal Projection Profile로 콘텐츠 밴드를 감지."""
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    h, w = gray.shape
+    features = features or _ImageFeatures(img)
+    h, w = features.gray.shape
 
     # v5.1: 적응형 로컬 배경 콘텐츠 감지 (다중 배경색 대응)
-    combined = _compute_adaptive_content(gray, bg_diff_thresh=20, canny_low=30, canny_high=90)
+    combined = features.content(bg_diff_thresh=20, canny_low=30, canny_high=90)
 
     # Horizontal Projection
-    h_proj = np.mean(combined.astype(np.float32), axis=1)
+    h_proj = _mask_density(combined, axis=1)
 
     # 적응형 스무딩 (v2: 더 강한 스무딩으로 노이즈 제거)
     smooth_k = max(5, h // 100)
@@ -826,52 +990,7 @@ def _detect_content_bands(
         content_thresh = CONTENT_THRESH
 
     is_content = h_proj > content_thresh
-
-    bands = []
-    band_start = None
-
-    for row in range(h):
-        if is_content[row] and band_start is None:
-            band_start = row
-        elif not is_content[row] and band_start is not None:
-            if row - band_start >= MIN_BAND_H:
-                bands.append({"y_start": band_start, "y_end": row})
-            band_start = None
-
-    if band_start is not None and h - band_start >= MIN_BAND_H:
-        bands.append({"y_start": band_start, "y_end": h})
-
-    # 가까운 밴드 병합
-    merged = []
-    for band in bands:
-        if merged and band["y_start"] - merged[-1]["y_end"] < MIN_GAP_H:
-            merged[-1]["y_end"] = band["y_end"]
-        else:
-            merged.append(dict(band))
-
-    # 세부 측정
-    for band in merged:
-        y1, y2 = band["y_start"], band["y_end"]
-        band["height"] = y2 - y1
-        band["center_y"] = (y1 + y2) // 2
-
-        band_content = combined[y1:y2, :]
-        v_proj = np.mean(band_content.astype(np.float32), axis=0)
-
-        band["left_margin"] = 0
-        for col in range(w):
-            if v_proj[col] > 0.03:  # v1: 0.02
-                band["left_margin"] = col
-                break
-
-        band["right_margin"] = 0
-        for col in range(w - 1, -1, -1):
-            if v_proj[col] > 0.03:
-                band["right_margin"] = (w - 1) - col
-                break
-
-        band["content_width"] = w - band["left_margin"] - band["right_margin"]
-        band["density"] = float(np.mean(band_content))
+    merged = _extract_bands(combined, is_content, MIN_BAND_H, MIN_GAP_H)
 
     if label:
         for i, b in enumerate(merged):
@@ -893,7 +1012,7 @@ def _detect_sub_bands(img: np.ndarray, img_w: int, img_h: int) -> List[Dict]:
     # v5.1: 적응형 로컬 배경 (더 민감한 임계값)
     combined = _compute_adaptive_content(gray, bg_diff_thresh=15, canny_low=25, canny_high=80)
 
-    h_proj = np.mean(combined.astype(np.float32), axis=1)
+    h_proj = _mask_density(combined, axis=1)
 
     smooth_k = max(3, h // 60)
     if smooth_k % 2 == 0:
@@ -904,51 +1023,7 @@ def _detect_sub_bands(img: np.ndarray, img_w: int, img_h: int) -> List[Dict]:
     MIN_GAP_H = max(3, h // 50)              # 더 좁은 갭도 인식
     is_content = h_proj > 0.02               # 더 민감 (전체: 0.025)
 
-    bands: List[Dict] = []
-    band_start = None
-
-    for row in range(h):
-        if is_content[row] and band_start is None:
-            band_start = row
-        elif not is_content[row] and band_start is not None:
-            if row - band_start >= MIN_BAND_H:
-                bands.append({"y_start": band_start, "y_end": row})
-            band_start = None
-
-    if band_start is not None and h - band_start >= MIN_BAND_H:
-        bands.append({"y_start": band_start, "y_end": h})
-
-    merged: List[Dict] = []
-    for band in bands:
-        if merged and band["y_start"] - merged[-1]["y_end"] < MIN_GAP_H:
-            merged[-1]["y_end"] = band["y_end"]
-        else:
-            merged.append(dict(band))
-
-    for band in merged:
-        y1, y2 = band["y_start"], band["y_end"]
-        band["height"] = y2 - y1
-        band["center_y"] = (y1 + y2) // 2
-
-        band_content = combined[y1:y2, :]
-        v_proj = np.mean(band_content.astype(np.float32), axis=0)
-
-        band["left_margin"] = 0
-        for col in range(w):
-            if v_proj[col] > 0.03:
-                band["left_margin"] = col
-                break
-
-        band["right_margin"] = 0
-        for col in range(w - 1, -1, -1):
-            if v_proj[col] > 0.03:
-                band["right_margin"] = (w - 1) - col
-                break
-
-        band["content_width"] = w - band["left_margin"] - band["right_margin"]
-        band["density"] = float(np.mean(band_content))
-
-    return merged
+    return _extract_bands(combined, is_content, MIN_BAND_H, MIN_GAP_H)
 
 
 def _decompose_large_bands(
@@ -988,7 +1063,9 @@ def _decompose_large_bands(
 # 밴드 경계 정밀 보정 (v4)
 # ═══════════════════════════════════════════════════════════
 
-def _refine_band_edges(bands: List[Dict], img: np.ndarray) -> List[Dict]:
+def _refine_band_edges(
+    bands: List[Dict], img: np.ndarray, features: Optional[_ImageFeatures] = None,
+) -> List[Dict]:
     """
     밴드의 y_start/y_end를 실제 콘텐츠 픽셀 경계로 정밀 보정.
 
@@ -999,14 +1076,15 @@ def _refine_band_edges(bands: List[Dict], img: np.ndarray) -> List[Dict]:
     if not bands:
         return bands
 
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    h, w = gray.shape
+    features = features or _ImageFeatures(img)
+    h, w = features.gray.shape
 
     # v5.1: 적응형 로컬 배경 기반 콘텐츠 감지
-    content_mask = _compute_adaptive_content(gray, bg_diff_thresh=25, canny_low=40, canny_high=100)
-    combined = np.mean(content_mask.astype(np.float32), axis=1)
+    content_mask = features.content(bg_diff_thresh=25, canny_low=40, canny_high=100)
+    combined = _mask_density(content_mask, axis=1)
 
     EDGE_THRESH = 0.025  # 행의 2.5% 이상 콘텐츠 = 콘텐츠 행
+    is_content_row = combined >= EDGE_THRESH
 
     refined_count = 0
     for band in bands:
@@ -1014,19 +1092,18 @@ def _refine_band_edges(bands: List[Dict], img: np.ndarray) -> List[Dict]:
         band_h = y2 - y1
         max_trim = min(band_h // 4, 30)  # 각 방향 최대 25% 또는 30px
 
-        # y_start 보정: 첫 콘텐츠 행 찾기
+        # y_start 보정: 위쪽 max_trim 행 안의 첫 콘텐츠 행
         new_y1 = y1
-        for row in range(y1, min(y2, y1 + max_trim)):
-            if combined[row] >= EDGE_THRESH:
-                new_y1 = row
-                break
+        first = _first_true(is_content_row[y1:min(y2, y1 + max_trim)])
+        if first is not None:
+            new_y1 = y1 + first
 
-        # y_end 보정: 마지막 콘텐츠 행 찾기
+        # y_end 보정: 아래쪽 max_trim 행 안의 마지막 콘텐츠 행
         new_y2 = y2
-        for row in range(y2 - 1, max(y1, y2 - max_trim) - 1, -1):
-            if combined[row] >= EDGE_THRESH:
-                new_y2 = row + 1
-                break
+        lo = max(y1, y2 - max_trim)
+        last = _first_true(is_content_row[lo:y2][::-1])
+        if last is not None:
+            new_y2 = y2 - last
 
         if new_y2 - new_y1 >= 8:
             if new_y1 != y1 or new_y2 != y2:
@@ -1133,38 +1210,7 @@ def _match_gaps_by_position(
 
     # DP 순서 보존 매칭
     MIN_SCORE = 0.3
-    dp = np.zeros((n_d + 1, n_v + 1))
-    choice = [[None] * (n_v + 1) for _ in range(n_d + 1)]
-
-    for di in range(1, n_d + 1):
-        for vi in range(1, n_v + 1):
-            skip_d = dp[di - 1][vi]
-            skip_v = dp[di][vi - 1]
-            match_s = dp[di - 1][vi - 1] + score_matrix[di - 1][vi - 1]
-
-            best = max(skip_d, skip_v, match_s)
-            dp[di][vi] = best
-
-            if best == match_s and score_matrix[di - 1][vi - 1] >= MIN_SCORE:
-                choice[di][vi] = "match"
-            elif best == skip_d:
-                choice[di][vi] = "skip_d"
-            else:
-                choice[di][vi] = "skip_v"
-
-    matches: List[Tuple[int, int]] = []
-    di, vi = n_d, n_v
-    while di > 0 and vi > 0:
-        if choice[di][vi] == "match":
-            matches.append((di - 1, vi - 1))
-            di -= 1
-            vi -= 1
-        elif choice[di][vi] == "skip_d":
-            di -= 1
-        else:
-            vi -= 1
-
-    matches.reverse()
+    matches = align_ordered(score_matrix, MIN_SCORE)
 
     # 매칭 점수를 포함하여 반환 (품질 필터링용)
     scored: List[Tuple[int, int, float]] = []
@@ -1264,6 +1310,52 @@ def _compare_gap_spacings(
 # 밴드 매칭 v2: 시각적 유사도 + 순서 보존
 # ═══════════════════════════════════════════════════════════
 
+def _hist_correl_matrix(d_hists, v_hists) -> np.ndarray:
+    """
+    모든 (design, dev) 히스토그램 쌍의 cv2.HISTCMP_CORREL을 한 번의 행렬곱으로 계산.
+    입력은 히스토그램 리스트 또는 (N, bins) 배열.
+
+    compareHist와 같은 원시 모멘트 식: (Σab - ΣaΣb/n) / sqrt(분산a × 분산b),
+    분산 곱의 절댓값이 DBL_EPSILON 이하(평평한 히스토그램)면 1.0.
+    Returns: (len(d_hists), len(v_hists)) float64
+    """
+    d = np.array(d_hists, dtype=np.float64).reshape(len(d_hists), -1)
+    v = np.array(v_hists, dtype=np.float64).reshape(len(v_hists), -1)
+    scale = 1.0 / d.shape[1]
+    s_d = d.sum(axis=1)
+    s_v = v.sum(axis=1)
+    var_d = np.einsum("ij,ij->i", d, d) - s_d * s_d * scale
+    var_v = np.einsum("ij,ij->i", v, v) - s_v * s_v * scale
+    num = d @ v.T - np.outer(s_d, s_v) * scale
+    denom2 = np.outer(var_d, var_v)
+    flat = np.abs(denom2) <= np.finfo(np.float64).eps
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correl = num / np.sqrt(denom2)
+    correl[flat] = 1.0
+    return correl
+
+
+def _field(items, key: str) -> np.ndarray:
+    """밴드/존 dict 리스트 또는 ElementSet에서 key 열을 float64 배열로."""
+    if isinstance(items, ElementSet):
+        return getattr(items, key).astype(np.float64)
+    return np.array([it[key] for it in items], dtype=np.float64)
+
+
+def _position_sim(d_items, v_items, key: str, extent: int, falloff: float) -> np.ndarray:
+    """상대 위치 유사도 행렬: max(0, 1 - |d/extent - v/extent| × falloff)."""
+    d_rel = _field(d_items, key) / extent
+    v_rel = _field(v_items, key) / extent
+    return np.maximum(0.0, 1.0 - np.abs(d_rel[:, None] - v_rel[None, :]) * falloff)
+
+
+def _size_ratio(d_items, v_items, key: str) -> np.ndarray:
+    """크기 비율 행렬: min(d, v) / max(d, v, 1)."""
+    d_size = _field(d_items, key)[:, None]
+    v_size = _field(v_items, key)[None, :]
+    return np.minimum(d_size, v_size) / np.maximum(np.maximum(d_size, v_size), 1)
+
+
 def _band_histogram(img: np.ndarray, band: Dict) -> np.ndarray:
     """밴드 영역의 색상 히스토그램을 계산."""
     region = img[band["y_start"]:band["y_end"], :]
@@ -1287,74 +1379,25 @@ def _match_bands_visual(
     if not design_bands or not dev_bands:
         return []
 
-    n_d = len(design_bands)
-    n_v = len(dev_bands)
-
     # ── 유사도 매트릭스 계산 ──
     # 히스토그램 미리 계산
     d_hists = [_band_histogram(design_img, b) for b in design_bands]
     v_hists = [_band_histogram(dev_img, b) for b in dev_bands]
 
-    score_matrix = np.zeros((n_d, n_v))
-
-    for di in range(n_d):
-        db = design_bands[di]
-        for vi in range(n_v):
-            vb = dev_bands[vi]
-
-            # 시각적 유사도 (히스토그램 상관)
-            visual_sim = cv2.compareHist(d_hists[di], v_hists[vi], cv2.HISTCMP_CORREL)
-            visual_sim = max(0.0, visual_sim)  # 음수 → 0
+    # 시각적 유사도 (히스토그램 상관, 음수 → 0)
+    visual_sim = np.maximum(0.0, _hist_correl_matrix(d_hists, v_hists))
 
-            # 위치 유사도 (상대 위치 기반)
-            d_rel = db["center_y"] / img_h
-            v_rel = vb["center_y"] / img_h
-            pos_sim = max(0.0, 1.0 - abs(d_rel - v_rel) * 4)
+    # 위치 유사도 (상대 위치 기반)
+    pos_sim = _position_sim(design_bands, dev_bands, "center_y", img_h, 4)
 
-            # 높이 유사도
-            h_ratio = min(db["height"], vb["height"]) / max(db["height"], vb["height"], 1)
+    # 높이 유사도
+    h_ratio = _size_ratio(design_bands, dev_bands, "height")
 
-            # 결합 점수: 시각 40% + 위치 30% + 높이 30%
-            score_matrix[di, vi] = visual_sim * 0.4 + pos_sim * 0.3 + h_ratio * 0.3
+    # 결합 점수: 시각 40% + 위치 30% + 높이 30%
+    score_matrix = visual_sim * 0.4 + pos_sim * 0.3 + h_ratio * 0.3
 
     # ── 순서 보존 매칭 (DP 기반) ──
-    # dp[i][j] = design[:i+1]와 dev[:j+1]에서의 최대 매칭 점수 합
-    dp = np.zeros((n_d + 1, n_v + 1))
-    choice = [[None] * (n_v + 1) for _ in range(n_d + 1)]
-
-    for di in range(1, n_d + 1):
-        for vi in range(1, n_v + 1):
-            # 옵션 1: 이 쌍을 매칭하지 않음
-            skip_d = dp[di - 1][vi]
-            skip_v = dp[di][vi - 1]
-
-            # 옵션 2: 이 쌍을 매칭
-            match_score = dp[di - 1][vi - 1] + score_matrix[di - 1][vi - 1]
-
-            best = max(skip_d, skip_v, match_score)
-            dp[di][vi] = best
-
-            if best == match_score and score_matrix[di - 1][vi - 1] >= MATCH_MIN_SCORE:
-                choice[di][vi] = "match"
-            elif best == skip_d:
-                choice[di][vi] = "skip_d"
-            else:
-                choice[di][vi] = "skip_v"
-
-    # 역추적으로 매칭 쌍 추출
-    matches = []
-    di, vi = n_d, n_v
-    while di > 0 and vi > 0:
-        if choice[di][vi] == "match":
-            matches.append((di - 1, vi - 1))
-            di -= 1
-            vi -= 1
-        elif choice[di][vi] == "skip_d":
-            di -= 1
-        else:
-            vi -= 1
-
-    matches.reverse()
+    matches = align_ordered(score_matrix, MATCH_MIN_SCORE)
 
     # 매칭 점수를 포함하여 반환 (품질 필터링용)
     scored_matches: List[Tuple[int, int, float]] = []
@@ -1554,11 +1597,66 @@ def _merge_overlapping(differences: List[Dict]) -> List[Dict]:
 # v6: 요소 단위(Element-Level) 감지 + 매칭 + 비교
 # ═══════════════════════════════════════════════════════════
 
+class ElementSet:
+    """
+    감지된 UI 요소 묶음 (struct-of-arrays).
+
+    요소마다 dict + 512칸 히스토그램 배열을 따로 들고 다니던 것을 열 단위 배열로 모은다.
+      - x, y, w, h, y_end: int64 (N,)
+      - center_x, center_y: float64 (N,) — 연결 컴포넌트 무게중심
+      - hists: float32 (N, 512) — 8×8×8 BGR 히스토그램 (L2 정규화, 매칭용 시각 지문)
+
+    매칭은 열 배열을 그대로 쓰고, elems[i]는 파이썬 스칼라로 된 dict 뷰를 돌려준다
+    (차이 생성 / JSON 직렬화 등 dict를 기대하는 쪽 호환용, 히스토그램 제외).
+    """
+
+    def __init__(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        w: np.ndarray,
+        h: np.ndarray,
+        center_x: np.ndarray,
+        center_y: np.ndarray,
+        hists: np.ndarray,
+    ):
+        self.x = np.asarray(x, dtype=np.int64)
+        self.y = np.asarray(y, dtype=np.int64)
+        self.w = np.asarray(w, dtype=np.int64)
+        self.h = np.asarray(h, dtype=np.int64)
+        self.y_end = self.y + self.h
+        self.center_x = np.asarray(center_x, dtype=np.float64)
+        self.center_y = np.asarray(center_y, dtype=np.float64)
+        self.hists = np.asarray(hists, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def __getitem__(self, i: int) -> Dict:
+        return {
+            "x": int(self.x[i]),
+            "y": int(self.y[i]),
+            "w": int(self.w[i]),
+            "h": int(self.h[i]),
+            "y_end": int(self.y_end[i]),
+            "center_x": float(self.center_x[i]),
+            "center_y": float(self.center_y[i]),
+        }
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def to_dicts(self) -> List[Dict]:
+        """API 경계용: 요소별 dict 리스트 (히스토그램 제외)."""
+        return list(self)
+
+
 def _detect_ui_elements(
     img: np.ndarray,
     exclude_top: int = 0,
     min_area: int = 80,
-) -> List[Dict]:
+    features: Optional[_ImageFeatures] = None,
+) -> ElementSet:
     """
     UI 요소를 개별 행(row) 단위로 감지.
 
@@ -1570,13 +1668,14 @@ def _detect_ui_elements(
     이전(v8) 문제: kh=8px → 12~20px 간격의 요소가 전부 하나로 합쳐짐
     → "일러스트+타이틀+설명+토글"이 하나의 거대 blob → 간격 측정 불가
     """
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    h, w = gray.shape
+    features = features or _ImageFeatures(img)
+    h, w = features.gray.shape
 
-    content = _compute_adaptive_content(gray)
+    content = features.content()
 
-    # 상태바 제외
+    # 상태바 제외 (공유 마스크라 복사 후 수정)
     if exclude_top > 0:
+        content = content.copy()
         content[:exclude_top, :] = False
 
     content_u8 = content.astype(np.uint8) * 255
@@ -1595,31 +1694,25 @@ def _detect_ui_elements(
     # ── 연결 컴포넌트 분석 ──
     num_labels, _labels, stats, centroids = cv2.connectedComponentsWithStats(dilated)
 
-    elements: List[Dict] = []
-    for i in range(1, num_labels):  # 0 = 배경
-        x, y, el_w, el_h, area = stats[i]
-        if area < min_area or el_w < 4 or el_h < 4:
-            continue
+    xs, ys, ws, hs, areas = stats[1:].T  # 0 = 배경
+    keep = np.flatnonzero((areas >= min_area) & (ws >= 4) & (hs >= 4))
+    # y좌표 → x좌표 순 정렬 (안정 정렬: 같은 위치면 라벨 순)
+    keep = keep[np.lexsort((xs[keep], ys[keep]))]
 
-        # v8: 요소 영역의 시각적 지문(fingerprint) 계산
+    # v8: 요소 영역의 시각적 지문(fingerprint) 계산
+    hists = np.empty((len(keep), 512), dtype=np.float32)
+    for row, i in enumerate(keep):
+        x, y, el_w, el_h = xs[i], ys[i], ws[i], hs[i]
         region = img[y:y+el_h, x:x+el_w]
         hist = cv2.calcHist([region], [0, 1, 2], None, [8, 8, 8],
                             [0, 256, 0, 256, 0, 256])
         cv2.normalize(hist, hist)
+        hists[row] = hist.ravel()
 
-        elements.append({
-            "x": int(x),
-            "y": int(y),
-            "w": int(el_w),
-            "h": int(el_h),
-            "y_end": int(y + el_h),
-            "center_x": float(centroids[i][0]),
-            "center_y": float(centroids[i][1]),
-            "_hist": hist.flatten(),  # 매칭용 내부 필드
-        })
-
-    # y좌표 → x좌표 순 정렬
-    elements.sort(key=lambda e: (e["y"], e["x"]))
+    elements = ElementSet(
+        xs[keep], ys[keep], ws[keep], hs[keep],
+        centroids[keep + 1, 0], centroids[keep + 1, 1], hists,
+    )
 
     print(f"  [요소감지] {len(elements)}개 UI 요소 감지 "
           f"(exclude_top={exclude_top}, kw={kw}, kh={kh})")
@@ -1630,9 +1723,121 @@ def _detect_ui_elements(
     return elements
 
 
+def _batch_ssim(pairs: List[Tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+    """
+    같은 크기 gray uint8 쌍 여러 개의 SSIM을 한 번에 계산.
+
+    skimage structural_similarity 기본값(7×7 균일 창, 표본 공분산, data_range=255)과 같은 식.
+    skimage는 경계를 반사로 채워 필터링한 뒤 가장자리 3px을 버리고 평균하므로,
+    창이 크롭 안에 완전히 들어가는 위치만 평균하면 된다. 그래서 높이순으로 정렬한 크롭을
+    SSIM_BATCH_SIZE개씩 가로로 이어 붙인 캔버스(선반) 하나에 boxFilter를 한 번씩 돌리고,
+    크롭별 평균은 SSIM 맵의 적분 영상에서 사각형 합으로 꺼낸다.
+    Returns: (K,) float64
+    """
+    win = SSIM_WIN_SIZE
+    pad = (win - 1) // 2
+    np_win = win * win
+    cov_norm = np_win / (np_win - 1)
+    ssim_c1 = (0.01 * 255) ** 2
+    ssim_c2 = (0.03 * 255) ** 2
+
+    sizes = np.array([a.shape for a, _ in pairs], dtype=np.int64).reshape(-1, 2)
+    order = np.argsort(sizes[:, 0], kind="stable")
+    result = np.empty(len(pairs))
+
+    def box(img: np.ndarray) -> np.ndarray:
+        return cv2.boxFilter(img, cv2.CV_64F, (win, win), normalize=True,
+                             borderType=cv2.BORDER_CONSTANT)
+
+    for start in range(0, len(order), SSIM_BATCH_SIZE):
+        shelf = order[start:start + SSIM_BATCH_SIZE]
+        heights = sizes[shelf, 0]
+        widths = sizes[shelf, 1]
+        x0 = np.concatenate(([0], np.cumsum(widths)[:-1]))
+
+        x = np.zeros((int(heights.max()), int(widths.sum())))
+        y = np.zeros_like(x)
+        for idx, ox in zip(shelf, x0):
+            a, b = pairs[idx]
+            x[:a.shape[0], ox:ox + a.shape[1]] = a
+            y[:b.shape[0], ox:ox + b.shape[1]] = b
+
+        # 창 평균/분산 (창 합은 정수라 정확, skimage uniform_filter와 반올림 수준 차이)
+        ux = box(x)
+        uy = box(y)
+        uxy = box(x * y)
+        x *= x
+        y *= y
+        x += y
+        uxx_yy = box(x)
+        ux_uy = ux * uy
+        ux *= ux
+        uy *= uy
+        ux += uy                                         # ux² + uy²
+
+        # S = (2·ux·uy + C1)(2·vxy + C2) / ((ux² + uy² + C1)(vx + vy + C2))
+        uxy -= ux_uy
+        uxy *= 2 * cov_norm
+        uxy += ssim_c2                                   # 2·vxy + C2
+        ux_uy *= 2
+        ux_uy += ssim_c1                                 # 2·ux·uy + C1
+        uxx_yy -= ux
+        uxx_yy *= cov_norm
+        uxx_yy += ssim_c2                                # vx + vy + C2
+        ux += ssim_c1                                    # ux² + uy² + C1
+        s_map = ux_uy
+        s_map *= uxy
+        ux *= uxx_yy
+        s_map /= ux
+
+        # 크롭별 유효 창 중심: 행 [pad, h - pad), 열 [ox + pad, ox + w - pad)
+        integral = cv2.integral(s_map, sdepth=cv2.CV_64F)
+        row0, row1 = pad, heights - pad
+        col0, col1 = x0 + pad, x0 + widths - pad
+        sums = integral[row1, col1] - integral[row0, col1] - integral[row1, col0] + integral[row0, col0]
+        result[shelf] = sums / ((row1 - row0) * (col1 - col0))
+    return result
+
+
+def _crop_pair_ssims(
+    pairs: List[Tuple[int, int]],
+    design_elems: ElementSet,
+    dev_elems: ElementSet,
+    design_img: np.ndarray,
+    dev_img: np.ndarray,
+) -> Dict[Tuple[int, int], float]:
+    """
+    매칭 쌍별 크롭 SSIM (두 요소를 작은 쪽 크기, 최대 120px로 맞춘 gray 비교).
+
+    크롭이 비었거나 맞춘 크기가 SSIM 창보다 작은 쌍은 결과에서 빠진다 (검증 생략).
+    """
+    keys: List[Tuple[int, int]] = []
+    grays: List[Tuple[np.ndarray, np.ndarray]] = []
+    for d_idx, v_idx in pairs:
+        de = design_elems[d_idx]
+        ve = dev_elems[v_idx]
+        d_crop = design_img[de["y"]:de["y_end"], de["x"]:de["x"]+de["w"]]
+        v_crop = dev_img[ve["y"]:ve["y_end"], ve["x"]:ve["x"]+ve["w"]]
+        if d_crop.size == 0 or v_crop.size == 0:
+            continue
+        # 작은 쪽 크기로 리사이즈
+        target_h = min(d_crop.shape[0], v_crop.shape[0], 120)
+        target_w = min(d_crop.shape[1], v_crop.shape[1], 120)
+        if target_h < SSIM_WIN_SIZE or target_w < SSIM_WIN_SIZE:
+            continue
+        d_g = cv2.cvtColor(cv2.resize(d_crop, (target_w, target_h)), cv2.COLOR_BGR2GRAY)
+        v_g = cv2.cvtColor(cv2.resize(v_crop, (target_w, target_h)), cv2.COLOR_BGR2GRAY)
+        keys.append((d_idx, v_idx))
+        grays.append((d_g, v_g))
+
+    if not grays:
+        return {}
+    return dict(zip(keys, _batch_ssim(grays).tolist()))
+
+
 def _match_elements(
-    design_elems: List[Dict],
-    dev_elems: List[Dict],
+    design_elems: ElementSet,
+    dev_elems: ElementSet,
     img_w: int,
     img_h: int,
     design_img: Optional[np.ndarray] = None,
@@ -1656,108 +1861,48 @@ def _match_elements(
     n_d = len(design_elems)
     n_v = len(dev_elems)
 
-    # ── 유사도 매트릭스 계산 ──
-    score_matrix = np.zeros((n_d, n_v))
-    for di in range(n_d):
-        de = design_elems[di]
-        for vi in range(n_v):
-            ve = dev_elems[vi]
-
-            # 1. Y위치 유사도 (수직 위치가 핵심)
-            dy = abs(de["center_y"] / img_h - ve["center_y"] / img_h)
-            y_sim = max(0.0, 1.0 - dy * 5)
-
-            # 2. X위치 유사도 (수평 정렬)
-            dx = abs(de["center_x"] / img_w - ve["center_x"] / img_w)
-            x_sim = max(0.0, 1.0 - dx * 4)
-
-            # 3. 크기 유사도
-            w_ratio = min(de["w"], ve["w"]) / max(de["w"], ve["w"], 1)
-            h_ratio = min(de["h"], ve["h"]) / max(de["h"], ve["h"], 1)
-            size_sim = (w_ratio + h_ratio) / 2
-
-            # 4. 시각적 유사도 (히스토그램 상관)
-            visual_sim = 0.0
-            d_hist = de.get("_hist")
-            v_hist = ve.get("_hist")
-            if d_hist is not None and v_hist is not None:
-                visual_sim = cv2.compareHist(
-                    d_hist.astype(np.float32),
-                    v_hist.astype(np.float32),
-                    cv2.HISTCMP_CORREL,
-                )
-                visual_sim = max(0.0, visual_sim)
-
-            # 결합: Y위치 35% + 시각 30% + 수평정렬 20% + 크기 15%
-            score_matrix[di, vi] = (
-                y_sim * 0.35 + visual_sim * 0.30 +
-                x_sim * 0.20 + size_sim * 0.15
-            )
+    # ── 유사도 매트릭스 계산 (n_d × n_v 브로드캐스트) ──
+    # 1. Y위치 유사도 (수직 위치가 핵심)
+    y_sim = _position_sim(design_elems, dev_elems, "center_y", img_h, 5)
+
+    # 2. X위치 유사도 (수평 정렬)
+    x_sim = _position_sim(design_elems, dev_elems, "center_x", img_w, 4)
+
+    # 3. 크기 유사도
+    size_sim = (_size_ratio(design_elems, dev_elems, "w") + _size_ratio(design_elems, dev_elems, "h")) / 2
+
+    # 4. 시각적 유사도 (히스토그램 상관)
+    visual_sim = np.maximum(0.0, _hist_correl_matrix(design_elems.hists, dev_elems.hists))
+
+    # 결합: Y위치 35% + 시각 30% + 수평정렬 20% + 크기 15%
+    score_matrix = (
+        y_sim * 0.35 + visual_sim * 0.30 +
+        x_sim * 0.20 + size_sim * 0.15
+    )
 
     # ── 순서 보존 DP 매칭 (밴드 매칭과 동일한 접근) ──
     MIN_ELEM_SCORE = 0.40  # v6 0.35 → v8 0.40 (더 보수적)
-    dp = np.zeros((n_d + 1, n_v + 1))
-    choice = [[None] * (n_v + 1) for _ in range(n_d + 1)]
-
-    for di in range(1, n_d + 1):
-        for vi in range(1, n_v + 1):
-            skip_d = dp[di - 1][vi]
-            skip_v = dp[di][vi - 1]
-            match_s = dp[di - 1][vi - 1] + score_matrix[di - 1][vi - 1]
-
-            best = max(skip_d, skip_v, match_s)
-            dp[di][vi] = best
-
-            if best == match_s and score_matrix[di - 1][vi - 1] >= MIN_ELEM_SCORE:
-                choice[di][vi] = "match"
-            elif best == skip_d:
-                choice[di][vi] = "skip_d"
-            else:
-                choice[di][vi] = "skip_v"
-
-    # 역추적
-    raw_matches = []
-    di, vi = n_d, n_v
-    while di > 0 and vi > 0:
-        if choice[di][vi] == "match":
-            raw_matches.append((di - 1, vi - 1))
-            di -= 1
-            vi -= 1
-        elif choice[di][vi] == "skip_d":
-            di -= 1
-        else:
-            vi -= 1
-    raw_matches.reverse()
+    allowed = None
+    if ELEMENT_MATCH_BAND is not None:
+        allowed = shift_band(
+            design_elems.center_y / img_h, dev_elems.center_y / img_h, ELEMENT_MATCH_BAND,
+        )
+    raw_matches = align_ordered(score_matrix, MIN_ELEM_SCORE, allowed)
 
     # ── SSIM 크롭 검증 — 매칭된 요소가 실제로 같은 것인지 확인 ──
+    crop_ssims: Dict[Tuple[int, int], float] = {}
+    if design_img is not None and dev_img is not None:
+        crop_ssims = _crop_pair_ssims(raw_matches, design_elems, dev_elems, design_img, dev_img)
+
     matches: List[Tuple[int, int, float]] = []
     for d_idx, v_idx in raw_matches:
         s = float(score_matrix[d_idx][v_idx])
-        de = design_elems[d_idx]
-        ve = dev_elems[v_idx]
-
-        verified = True
-        if design_img is not None and dev_img is not None:
-            # 두 요소를 동일 크기로 크롭하여 SSIM 비교
-            d_crop = design_img[de["y"]:de["y_end"], de["x"]:de["x"]+de["w"]]
-            v_crop = dev_img[ve["y"]:ve["y_end"], ve["x"]:ve["x"]+ve["w"]]
-            if d_crop.size > 0 and v_crop.size > 0:
-                # 작은 쪽 크기로 리사이즈
-                target_h = min(d_crop.shape[0], v_crop.shape[0], 120)
-                target_w = min(d_crop.shape[1], v_crop.shape[1], 120)
-                if target_h >= 7 and target_w >= 7:
-                    d_resized = cv2.resize(d_crop, (target_w, target_h))
-                    v_resized = cv2.resize(v_crop, (target_w, target_h))
-                    d_g = cv2.cvtColor(d_resized, cv2.COLOR_BGR2GRAY)
-                    v_g = cv2.cvtColor(v_resized, cv2.COLOR_BGR2GRAY)
-                    crop_ssim = ssim(d_g, v_g)
-                    if crop_ssim < 0.15:
-                        print(f"  [SSIM거부] D[{d_idx}]↔V[{v_idx}] "
-                              f"ssim={crop_ssim:.2f} < 0.15 — 다른 요소")
-                        verified = False
-
-        if verified:
-            matches.append((d_idx, v_idx, s))
+        crop_ssim = crop_ssims.get((d_idx, v_idx))
+        if crop_ssim is not None and crop_ssim < 0.15:
+            print(f"  [SSIM거부] D[{d_idx}]↔V[{v_idx}] "
+                  f"ssim={crop_ssim:.2f} < 0.15 — 다른 요소")
+            continue
+        matches.append((d_idx, v_idx, s))
 
     print(f"  [요소매칭v8] DP {len(raw_matches)}개 → SSIM검증 후 {len(matches)}개 "
           f"(design={n_d}, dev={n_v})")
@@ -1789,8 +1934,8 @@ def _find_containing_band_idx(elem: Dict, bands: List[Dict]) -> int:
 
 def _compare_element_diffs(
     matches: List[Tuple[int, int, float]],
-    design_elems: List[Dict],
-    dev_elems: List[Dict],
+    design_elems: ElementSet,
+    dev_elems: ElementSet,
     dev_bands: List[Dict],
     img_w: int,
     img_h: int,
@@ -2144,8 +2289,8 @@ def format_differences_with_labels(
 # ═══════════════════════════════════════════════════════════
 
 def analyze_pixel_regions(
-    design_path: str,
-    dev_path: str,
+    design: np.ndarray,
+    dev_img: np.ndarray,
     pixel_regions: List[Dict],
     dev_w: int,
     dev_h: int,
@@ -2166,21 +2311,7 @@ def analyze_pixel_regions(
     5. size_change: 콘텐츠 크기 변경
     6. visual_change: 기타 시각적 변경
     """
-    design = cv2.imread(design_path)
-    dev = cv2.imread(dev_path)
-    if design is None or dev is None:
-        return []
-
-    # 정규화: dev 크기에 맞춤
-    if design.shape[1] != dev.shape[1]:
-        scale = dev.shape[1] / design.shape[1]
-        new_h = int(design.shape[0] * scale)
-        design = cv2.resize(design, (dev.shape[1], new_h), interpolation=cv2.INTER_LANCZOS4)
-
-    compare_h = min(design.shape[0], dev.shape[0])
-    design = design[:compare_h]
-    dev_img = dev[:compare_h]
-
+    # design/dev_img: ImageContext.aligned() 결과 (detect_and_compare와 같은 정렬 배열)
     img_h, img_w = dev_img.shape[:2]
     total_area = img_w * img_h
 
@@ -8,15 +8,19 @@ Gemini는 AI가 잘하는 영역에만 집중:
 """
 from __future__ import annotations
 
+import asyncio
 import base64
 import json
 import re
-from typing import Optional, List, Dict
+import sqlite3
+from typing import Optional, List, Dict, Tuple
 
 from PIL import Image
 import io
+import numpy as np
 import google.generativeai as genai
 from app.core.config import settings
+from app.services import gemini_cache
 
 genai.configure(api_key=settings.gemini_api_key)
 
@@ -73,9 +77,9 @@ Find 0~10 differences. If no differences in these categories, return [].
 """
 
 
-def _img_to_bytes(img_path: str, max_dim: int = 2048) -> bytes:
-    """이미지를 로드. 작은 이미지는 원본 그대로 전송."""
-    img = Image.open(img_path).convert("RGB")
+def _img_to_bytes(rgb: np.ndarray, max_dim: int = 2048) -> bytes:
+    """RGB 배열 → PNG bytes. 작은 이미지는 원본 그대로 전송."""
+    img = Image.fromarray(rgb)
     if max(img.width, img.height) <= 1000:
         buf = io.BytesIO()
         img.save(buf, format="PNG")
@@ -88,21 +92,75 @@ def _img_to_bytes(img_path: str, max_dim: int = 2048) -> bytes:
     return buf.getvalue()
 
 
-def _call_gemini(prompt: str, image_parts: list) -> Optional[str]:
-    """Gemini 모델 체인 호출."""
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """동시 Gemini 요청 수 제한 (GEMINI_MAX_CONCURRENCY)."""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(max(1, settings.gemini_max_concurrency))
+    return _semaphore
+
+
+async def _call_gemini(prompt: str, image_parts: list) -> Optional[str]:
+    """
+    Gemini 모델 체인 호출 (비동기 — 이벤트 루프를 막지 않음). 응답은 디스크 캐시.
+
+    캐시는 best-effort: SQLite 오류(잠김, 디스크 가득 참 등)는 로그만 남기고
+    조회는 미스, 저장은 건너뛴 것으로 처리한다.
+    """
+    try:
+        cached = await asyncio.to_thread(gemini_cache.lookup, GEMINI_MODELS, prompt, image_parts)
+    except sqlite3.Error as e:
+        print(f"[Gemini] 캐시 조회 실패 (미스로 처리): {e}")
+        cached = None
+    if cached:
+        model_name, raw = cached
+        print(f"[Gemini] 캐시 적중: {model_name} — {len(raw)}자")
+        return raw
+
+    async with _get_semaphore():
+        answered = await _call_gemini_chain(prompt, image_parts)
+    if not answered:
+        return None
+    model_name, raw = answered
+    try:
+        await asyncio.to_thread(gemini_cache.store, model_name, prompt, image_parts, raw)
+    except sqlite3.Error as e:
+        print(f"[Gemini] 캐시 저장 실패 (건너뜀): {e}")
+    return raw
+
+
+async def log_cache_stats():
+    """Gemini 응답 캐시 통계 로그 (이 프로세스의 hit/miss/store/evict + 현재 항목 수/크기)."""
+    if not gemini_cache.enabled():
+        return
+    try:
+        stats = await asyncio.to_thread(gemini_cache.cache_stats)
+    except sqlite3.Error as e:
+        print(f"[Gemini] 캐시 통계 조회 실패: {e}")
+        return
+    print(f"[Gemini] 캐시: 적중 {stats['hits']} / 미스 {stats['misses']} / "
+          f"저장 {stats['stores']} / LRU 삭제 {stats['evictions']}, "
+          f"{stats['entries']}개 {stats['bytes'] / 1024:.0f}KB")
+
+
+async def _call_gemini_chain(prompt: str, image_parts: list) -> Optional[Tuple[str, str]]:
+    """모델을 순서대로 시도. Returns: (응답한 모델명, 응답 텍스트) 또는 None"""
     last_error = None
     for model_name in GEMINI_MODELS:
         try:
             print(f"[Gemini] 모델 시도: {model_name}")
             model = genai.GenerativeModel(model_name)
             content = [prompt] + image_parts
-            response = model.generate_content(
+            response = await model.generate_content_async(
                 content,
                 generation_config={"temperature": 0.1, "max_output_tokens": 4096},
             )
             raw = response.text.strip()
             print(f"[Gemini] {model_name} 응답: {len(raw)}자 — {raw[:150]}")
-            return raw
+            return model_name, raw
         except Exception as e:
             last_error = e
             print(f"[Gemini] {model_name} 실패: {e}")
@@ -143,7 +201,7 @@ def _parse_json(raw: str) -> Optional[list]:
 
 
 async def label_bands(
-    dev_path: str,
+    dev_img: np.ndarray,
     bands: List[Dict],
 ) -> Optional[List[str]]:
     """
@@ -155,7 +213,7 @@ async def label_bands(
     if not bands:
         return None
 
-    dev_bytes = _img_to_bytes(dev_path)
+    dev_bytes = await asyncio.to_thread(_img_to_bytes, dev_img)
     dev_part = {"mime_type": "image/png", "data": base64.b64encode(dev_bytes).decode()}
 
     band_info = "\n".join(
@@ -167,7 +225,7 @@ async def label_bands(
     prompt = LABELING_PROMPT.format(n_bands=len(bands), band_info=band_info)
 
     print("[Gemini] 밴드 라벨링 시작")
-    raw = _call_gemini(prompt, [dev_part])
+    raw = await _call_gemini(prompt, [dev_part])
     if not raw:
         return None
 
@@ -180,8 +238,8 @@ async def label_bands(
 
 
 async def find_visual_diffs(
-    design_path: str,
-    dev_path: str,
+    design_img: np.ndarray,
+    dev_img: np.ndarray,
     dev_width: int,
     dev_height: int,
 ) -> List[Dict]:
@@ -192,8 +250,10 @@ async def find_visual_diffs(
     if not settings.gemini_api_key or settings.gemini_api_key == "your_gemini_api_key_here":
         return []
 
-    design_bytes = _img_to_bytes(design_path)
-    dev_bytes = _img_to_bytes(dev_path)
+    design_bytes, dev_bytes = await asyncio.gather(
+        asyncio.to_thread(_img_to_bytes, design_img),
+        asyncio.to_thread(_img_to_bytes, dev_img),
+    )
 
     design_part = {"mime_type": "image/png", "data": base64.b64encode(design_bytes).decode()}
     dev_part = {"mime_type": "image/png", "data": base64.b64encode(dev_bytes).decode()}
@@ -201,7 +261,7 @@ async def find_visual_diffs(
     prompt = VISUAL_DIFF_PROMPT.format(dev_width=dev_width, dev_height=dev_height)
 
     print("[Gemini] 시각적 차이 분석 시작 (색상/타이포/누락)")
-    raw = _call_gemini(prompt, [design_part, dev_part])
+    raw = await _call_gemini(prompt, [design_part, dev_part])
     if not raw:
         return []
 
@@ -278,26 +338,26 @@ Each item:
 Find the most significant difference in this region. Return at most 1-2 items."""
 
 
-def _crop_to_bytes(img_path: str, region: dict, padding: int = 20) -> Optional[bytes]:
-    """이미지에서 특정 영역을 크롭하여 PNG bytes로 반환."""
-    img = Image.open(img_path).convert("RGB")
+def _crop_to_bytes(rgb: np.ndarray, region: dict, padding: int = 20) -> Optional[bytes]:
+    """RGB 배열에서 특정 영역을 크롭하여 PNG bytes로 반환."""
+    img_h, img_w = rgb.shape[:2]
     x1 = max(0, region["x"] - padding)
     y1 = max(0, region["y"] - padding)
-    x2 = min(img.width, region["x"] + region["w"] + padding)
-    y2 = min(img.height, region["y"] + region["h"] + padding)
+    x2 = min(img_w, region["x"] + region["w"] + padding)
+    y2 = min(img_h, region["y"] + region["h"] + padding)
 
     if x2 - x1 < 10 or y2 - y1 < 10:
         return None
 
-    cropped = img.crop((x1, y1, x2, y2))
+    cropped = Image.fromarray(rgb[y1:y2, x1:x2])
     buf = io.BytesIO()
     cropped.save(buf, format="PNG")
     return buf.getvalue()
 
 
 async def analyze_uncovered_regions(
-    design_path: str,
-    dev_path: str,
+    design_img: np.ndarray,
+    dev_img: np.ndarray,
     uncovered_regions: List[Dict],
     dev_width: int,
     dev_height: int,
@@ -316,58 +376,76 @@ async def analyze_uncovered_regions(
     sorted_regions = sorted(uncovered_regions, key=lambda r: r.get("area", 0), reverse=True)
     targets = sorted_regions[:max_regions]
 
-    all_diffs: List[Dict] = []
+    # 영역별 호출을 동시에 실행 (동시성은 _call_gemini 세마포어가 제한)
+    results = await asyncio.gather(*[
+        _analyze_single_region(design_img, dev_img, region, dev_width, dev_height)
+        for region in targets
+    ])
+    all_diffs: List[Dict] = [d for region_diffs in results for d in region_diffs]
 
-    for region in targets:
-        design_crop = _crop_to_bytes(design_path, region)
-        dev_crop = _crop_to_bytes(dev_path, region)
-        if not design_crop or not dev_crop:
-            continue
+    print(f"[Gemini] 타겟 분석 결과: {len(all_diffs)}개 (미커버 {len(targets)}개 영역)")
+    return all_diffs
 
-        design_part = {"mime_type": "image/png", "data": base64.b64encode(design_crop).decode()}
-        dev_part = {"mime_type": "image/png", "data": base64.b64encode(dev_crop).decode()}
 
-        prompt = TARGETED_DIFF_PROMPT.format(
-            rx=region["x"], ry=region["y"],
-            rw=region["w"], rh=region["h"],
-            dev_width=dev_width, dev_height=dev_height,
-        )
+async def _analyze_single_region(
+    design_img: np.ndarray,
+    dev_img: np.ndarray,
+    region: Dict,
+    dev_width: int,
+    dev_height: int,
+) -> List[Dict]:
+    """미커버 영역 1개를 크롭하여 Gemini로 분석."""
+    design_crop, dev_crop = await asyncio.gather(
+        asyncio.to_thread(_crop_to_bytes, design_img, region),
+        asyncio.to_thread(_crop_to_bytes, dev_img, region),
+    )
+    if not design_crop or not dev_crop:
+        return []
 
-        print(f"[Gemini] 타겟 분석: ({region['x']},{region['y']}) {region['w']}×{region['h']}px")
-        raw = _call_gemini(prompt, [design_part, dev_part])
-        if not raw:
-            continue
+    design_part = {"mime_type": "image/png", "data": base64.b64encode(design_crop).decode()}
+    dev_part = {"mime_type": "image/png", "data": base64.b64encode(dev_crop).decode()}
+
+    prompt = TARGETED_DIFF_PROMPT.format(
+        rx=region["x"], ry=region["y"],
+        rw=region["w"], rh=region["h"],
+        dev_width=dev_width, dev_height=dev_height,
+    )
 
-        parsed = _parse_json(raw)
-        if not parsed:
+    print(f"[Gemini] 타겟 분석: ({region['x']},{region['y']}) {region['w']}×{region['h']}px")
+    raw = await _call_gemini(prompt, [design_part, dev_part])
+    if not raw:
+        return []
+
+    parsed = _parse_json(raw)
+    if not parsed:
+        return []
+
+    VALID_CATEGORIES = {"typography", "color", "layout", "missing", "spacing"}
+    VALID_SEVERITIES = {"critical", "major", "minor"}
+
+    diffs: List[Dict] = []
+    for d in parsed:
+        if not isinstance(d, dict) or "description" not in d:
             continue
 
-        VALID_CATEGORIES = {"typography", "color", "layout", "missing", "spacing"}
-        VALID_SEVERITIES = {"critical", "major", "minor"}
-
-        for d in parsed:
-            if not isinstance(d, dict) or "description" not in d:
-                continue
-
-            cat = str(d.get("category", "layout")).lower().strip()
-            if cat not in VALID_CATEGORIES:
-                cat = "layout"
-
-            sev = str(d.get("severity", "minor")).lower().strip()
-            if sev not in VALID_SEVERITIES:
-                sev = "minor"
-
-            all_diffs.append({
-                "category": cat,
-                "severity": sev,
-                "description": str(d.get("description", "")),
-                "design_value": str(d.get("design_value", "")),
-                "dev_value": str(d.get("dev_value", "")),
-                "bbox_x": region["x"],
-                "bbox_y": region["y"],
-                "bbox_w": region["w"],
-                "bbox_h": region["h"],
-            })
+        cat = str(d.get("category", "layout")).lower().strip()
+        if cat not in VALID_CATEGORIES:
+            cat = "layout"
+
+        sev = str(d.get("severity", "minor")).lower().strip()
+        if sev not in VALID_SEVERITIES:
+            sev = "minor"
 
-    print(f"[Gemini] 타겟 분석 결과: {len(all_diffs)}개 (미커버 {len(targets)}개 영역)")
-    return all_diffs
+        diffs.append({
+            "category": cat,
+            "severity": sev,
+            "description": str(d.get("description", "")),
+            "design_value": str(d.get("design_value", "")),
+            "dev_value": str(d.get("dev_value", "")),
+            "bbox_x": region["x"],
+            "bbox_y": region["y"],
+            "bbox_w": region["w"],
+            "bbox_h": region["h"],
+        })
+
+    return diffs
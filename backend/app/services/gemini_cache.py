@@ -0,0 +1,175 @@
+"""
+Gemini 응답 디스크 캐시 (SQLite).
+
+같은 이미지 bytes + 같은 프롬프트(temperature 0.1)는 사실상 같은 응답을 돌려주므로,
+element_analyzer 규칙만 바꿔 재분석할 때 AI 왕복을 없앤다.
+
+  - 키: sha256(모델명 + 프롬프트 + 이미지 파트 mime/데이터)
+  - TTL: GEMINI_CACHE_TTL_HOURS가 지난 항목은 미스로 처리 후 삭제
+  - 용량: 응답 크기 합이 GEMINI_CACHE_MAX_MB를 넘으면 가장 오래 안 쓴(LRU) 항목부터 삭제
+  - 통계: 프로세스별 hit/miss/store/evict 카운터 (cache_stats)
+
+sqlite3는 동기 API이므로 호출 측에서 asyncio.to_thread로 감싼다.
+GEMINI_CACHE_MAX_MB=0이면 캐시를 끈다.
+"""
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+EVICT_TARGET_RATIO = 0.9   # 용량 초과 시 상한의 90%까지 비움
+
+_stats: Dict[str, int] = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+_stats_lock = threading.Lock()
+_schema_ready = False
+
+
+def _count(name: str, n: int = 1):
+    with _stats_lock:
+        _stats[name] += n
+
+
+def enabled() -> bool:
+    return settings.gemini_cache_max_mb > 0
+
+
+def _connect() -> sqlite3.Connection:
+    global _schema_ready
+    conn = sqlite3.connect(settings.gemini_cache_path, timeout=10)
+    if not _schema_ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS gemini_responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " hits INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_gemini_responses_accessed_at"
+            " ON gemini_responses (accessed_at)"
+        )
+        conn.commit()
+        _schema_ready = True
+    return conn
+
+
+def make_key(model_name: str, prompt: str, image_parts: list) -> str:
+    """모델명 + 프롬프트 해시 + 이미지 파트별 해시 → 캐시 키."""
+    h = hashlib.sha256()
+    h.update(model_name.encode())
+    h.update(b"\0")
+    h.update(hashlib.sha256(prompt.encode()).digest())
+    for part in image_parts:
+        h.update(b"\0")
+        h.update(part.get("mime_type", "").encode())
+        data = part.get("data", "")
+        h.update(hashlib.sha256(data.encode() if isinstance(data, str) else data).digest())
+    return h.hexdigest()
+
+
+def lookup(model_names: List[str], prompt: str, image_parts: list) -> Optional[Tuple[str, str]]:
+    """
+    모델 체인 순서대로 캐시된 응답을 찾음.
+
+    Returns: (model_name, response) 또는 None
+    """
+    if not enabled():
+        return None
+    keys = {make_key(m, prompt, image_parts): m for m in model_names}
+    now = time.time()
+    expire_before = now - settings.gemini_cache_ttl_hours * 3600
+
+    conn = _connect()
+    try:
+        placeholders = ",".join("?" * len(keys))
+        rows = conn.execute(
+            f"SELECT key, response, created_at FROM gemini_responses WHERE key IN ({placeholders})",
+            list(keys),
+        ).fetchall()
+        found = {}
+        expired = []
+        for key, response, created_at in rows:
+            if created_at < expire_before:
+                expired.append(key)
+            else:
+                found[keys[key]] = (key, response)
+        if expired:
+            conn.executemany("DELETE FROM gemini_responses WHERE key = ?", [(k,) for k in expired])
+
+        for model_name in model_names:
+            if model_name in found:
+                key, response = found[model_name]
+                conn.execute(
+                    "UPDATE gemini_responses SET hits = hits + 1, accessed_at = ? WHERE key = ?",
+                    (now, key),
+                )
+                conn.commit()
+                _count("hits")
+                return model_name, response
+        conn.commit()
+    finally:
+        conn.close()
+    _count("misses")
+    return None
+
+
+def store(model_name: str, prompt: str, image_parts: list, response: str):
+    """응답 저장 후 용량 상한을 넘으면 LRU 순으로 삭제."""
+    if not enabled():
+        return
+    key = make_key(model_name, prompt, image_parts)
+    size = len(response.encode())
+    now = time.time()
+
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO gemini_responses"
+            " (key, model, response, size, hits, created_at, accessed_at)"
+            " VALUES (?, ?, ?, ?, 0, ?, ?)",
+            (key, model_name, response, size, now, now),
+        )
+        _count("stores")
+
+        max_bytes = settings.gemini_cache_max_mb * 1024 * 1024
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM gemini_responses").fetchone()[0]
+        if total > max_bytes:
+            target = int(max_bytes * EVICT_TARGET_RATIO)
+            evicted = 0
+            for old_key, old_size in conn.execute(
+                "SELECT key, size FROM gemini_responses ORDER BY accessed_at"
+            ).fetchall():
+                if total <= target:
+                    break
+                conn.execute("DELETE FROM gemini_responses WHERE key = ?", (old_key,))
+                total -= old_size
+                evicted += 1
+            _count("evictions", evicted)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def cache_stats() -> Dict[str, int]:
+    """프로세스 카운터 + 현재 캐시 항목 수/크기."""
+    with _stats_lock:
+        stats = dict(_stats)
+    if enabled():
+        conn = _connect()
+        try:
+            entries, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM gemini_responses"
+            ).fetchone()
+        finally:
+            conn.close()
+        stats.update(entries=entries, bytes=total)
+    return stats
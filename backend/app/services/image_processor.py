@@ -1,35 +1,109 @@
 from pathlib import Path
+from typing import Optional, Tuple
 from PIL import Image, ImageDraw
+import cv2
 import numpy as np
 
 
-def load_and_normalize(path_a: str, path_b: str) -> tuple:
-    """두 이미지를 같은 크기로 정규화하여 numpy 배열로 반환.
-
-    Returns:
-        (img_a, img_b, orig_a_size, orig_b_size)
-        orig_*_size = (width, height)
+class ImageContext:
     """
-    img_a = Image.open(path_a).convert("RGB")
-    img_b = Image.open(path_b).convert("RGB")
-
-    orig_a_size = (img_a.width, img_a.height)
-    orig_b_size = (img_b.width, img_b.height)
+    분석 1건의 디자인/개발 이미지를 한 번만 디코딩해서 모든 스테이지가 공유.
 
-    # 작은 쪽 기준으로 리사이즈 (비율 유지)
-    target_w = min(img_a.width, img_b.width)
-    target_h = min(img_a.height, img_b.height)
+    원본 RGB 배열과 크기만 즉시 갖고, 나머지 변형은 처음 쓰일 때 만들어 캐시한다:
+    - design_bgr / dev_bgr: OpenCV용 BGR
+    - normalized(): 픽셀 diff용 — 작은 쪽 크기로 맞춘 RGB 쌍 (PIL LANCZOS)
+    - aligned(): CV 측정용 — 디자인을 dev 너비로 리사이즈 후 공통 높이로 자른 BGR 쌍
 
-    img_a = img_a.resize((target_w, target_h), Image.LANCZOS)
-    img_b = img_b.resize((target_w, target_h), Image.LANCZOS)
-
-    return np.array(img_a), np.array(img_b), orig_a_size, orig_b_size
+    컨텍스트 자체는 프로세스 풀로 넘기지 않는다. 리사이즈 변형은 부모 프로세스에서
+    분석당 한 번 만들고, 각 스테이지에는 그 스테이지가 쓰는 배열만 넘긴다.
+    """
 
+    def __init__(self, design_rgb: np.ndarray, dev_rgb: np.ndarray):
+        self.design_rgb = design_rgb
+        self.dev_rgb = dev_rgb
+        self._design_bgr: Optional[np.ndarray] = None
+        self._dev_bgr: Optional[np.ndarray] = None
+        self._normalized: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._aligned: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def load(cls, design_path: str, dev_path: str) -> "ImageContext":
+        """두 이미지 파일을 디코딩 (분석당 1회)."""
+        return cls(_decode_rgb(design_path), _decode_rgb(dev_path))
+
+    # ── 원본 크기 (width, height) ──
+
+    @property
+    def design_size(self) -> Tuple[int, int]:
+        return self.design_rgb.shape[1], self.design_rgb.shape[0]
+
+    @property
+    def dev_size(self) -> Tuple[int, int]:
+        return self.dev_rgb.shape[1], self.dev_rgb.shape[0]
+
+    # ── 파생 배열 (지연 생성) ──
+
+    @property
+    def design_bgr(self) -> np.ndarray:
+        if self._design_bgr is None:
+            self._design_bgr = cv2.cvtColor(self.design_rgb, cv2.COLOR_RGB2BGR)
+        return self._design_bgr
+
+    @property
+    def dev_bgr(self) -> np.ndarray:
+        if self._dev_bgr is None:
+            self._dev_bgr = cv2.cvtColor(self.dev_rgb, cv2.COLOR_RGB2BGR)
+        return self._dev_bgr
+
+    def normalized(self) -> Tuple[np.ndarray, np.ndarray]:
+        """작은 쪽 기준 (min width, min height)으로 맞춘 RGB 쌍."""
+        if self._normalized is None:
+            img_a = Image.fromarray(self.design_rgb)
+            img_b = Image.fromarray(self.dev_rgb)
+            target_w = min(img_a.width, img_b.width)
+            target_h = min(img_a.height, img_b.height)
+            img_a = img_a.resize((target_w, target_h), Image.LANCZOS)
+            img_b = img_b.resize((target_w, target_h), Image.LANCZOS)
+            self._normalized = (np.array(img_a), np.array(img_b))
+        return self._normalized
+
+    def aligned(self) -> Tuple[np.ndarray, np.ndarray]:
+        """디자인을 dev 너비에 맞춰 리사이즈하고 공통 높이로 자른 BGR 쌍 (design, dev)."""
+        if self._aligned is None:
+            design = self.design_bgr
+            dev = self.dev_bgr
+            target_w = dev.shape[1]
+            if design.shape[1] != target_w:
+                scale = target_w / design.shape[1]
+                new_h = int(design.shape[0] * scale)
+                design = cv2.resize(design, (target_w, new_h), interpolation=cv2.INTER_LANCZOS4)
+            compare_h = min(design.shape[0], dev.shape[0])
+            self._aligned = (design[:compare_h], dev[:compare_h])
+        return self._aligned
+
+
+def _decode_rgb(path: str) -> np.ndarray:
+    """이미지 파일 → RGB uint8 배열 (EXIF 회전 미적용 — 좌표계는 저장된 픽셀 그대로)."""
+    with Image.open(path) as img:
+        return np.array(img.convert("RGB"))
+
+
+def probe_image(path: str) -> dict:
+    """
+    픽셀 디코딩 없이 헤더만 읽어 이미지 메타데이터 반환.
 
-def get_image_dimensions(path: str) -> tuple:
-    """이미지의 원본 (width, height) 반환."""
-    img = Image.open(path)
-    return img.width, img.height
+    Returns:
+        {"width", "height", "format", "bytes"}
+    """
+    with Image.open(path) as img:  # Image.open은 헤더만 파싱 (지연 로딩)
+        width, height = img.size
+        fmt = img.format
+    return {
+        "width": width,
+        "height": height,
+        "format": fmt,
+        "bytes": Path(path).stat().st_size,
+    }
 
 
 def scale_regions_to_original(
@@ -60,18 +134,18 @@ def scale_regions_to_original(
 
 
 def save_marked_image(
-    base_path: str,
+    base_img: np.ndarray,
     differences: list,
     output_path: str,
 ) -> str:
-    """차이점 바운딩 박스를 원본 이미지 위에 그려서 저장."""
+    """차이점 바운딩 박스를 원본 이미지(RGB 배열) 위에 그려서 저장."""
     SEVERITY_COLORS = {
         "critical": (220, 38, 38, 180),   # 빨강
         "major":    (234, 88, 12, 180),    # 주황
         "minor":    (202, 138, 4, 180),    # 노랑
     }
 
-    img = Image.open(base_path).convert("RGBA")
+    img = Image.fromarray(base_img).convert("RGBA")
     overlay = Image.new("RGBA", img.size, (0, 0, 0, 0))
     draw = ImageDraw.Draw(overlay)
 
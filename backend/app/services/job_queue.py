@@ -0,0 +1,160 @@
+"""
+SQLite 기반 영속 분석 작업 큐.
+
+API 프로세스는 작업을 등록만 하고, 실제 분석은 워커(`python -m app.worker`)가 가져가 실행한다.
+  - lease: 워커가 작업을 가져가면 lease_expires_at까지 독점
+  - heartbeat: 실행 중인 워커가 주기적으로 lease를 연장
+  - 만료된 lease: 워커가 죽은 것으로 보고 재등록 (max_attempts 초과 시 실패 처리)
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database import Analysis, AnalysisJob, AsyncSessionLocal
+
+LEASE_SECONDS = 120        # 하트비트 없이 lease가 유지되는 시간
+CLAIM_RETRIES = 5          # 다른 워커와 경합 시 재시도 횟수
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def enqueue_job(db: AsyncSession, analysis_id: str, priority: int = 0) -> AnalysisJob:
+    """분석 작업을 큐에 등록. 커밋은 호출 측 세션에서 Analysis와 함께 수행."""
+    job = AnalysisJob(analysis_id=analysis_id, priority=priority)
+    db.add(job)
+    return job
+
+
+async def claim_next_job(worker_id: str, lease_seconds: int = LEASE_SECONDS) -> Optional[AnalysisJob]:
+    """우선순위가 가장 높은 대기 작업을 lease. 없으면 None."""
+    async with AsyncSessionLocal() as db:
+        for _ in range(CLAIM_RETRIES):
+            result = await db.execute(
+                select(AnalysisJob.id)
+                .where(AnalysisJob.status == "queued")
+                .order_by(AnalysisJob.priority.desc(), AnalysisJob.created_at)
+                .limit(1)
+            )
+            job_id = result.scalar_one_or_none()
+            if job_id is None:
+                return None
+
+            now = _utcnow()
+            # 조건부 UPDATE — 다른 워커가 먼저 가져갔으면 rowcount=0
+            claimed = await db.execute(
+                update(AnalysisJob)
+                .where(AnalysisJob.id == job_id, AnalysisJob.status == "queued")
+                .values(
+                    status="leased",
+                    lease_owner=worker_id,
+                    lease_expires_at=now + timedelta(seconds=lease_seconds),
+                    heartbeat_at=now,
+                    attempts=AnalysisJob.attempts + 1,
+                    updated_at=now,
+                )
+            )
+            await db.commit()
+            if claimed.rowcount == 1:
+                job = await db.get(AnalysisJob, job_id)
+                return job
+        return None
+
+
+async def heartbeat(job_id: str, worker_id: str, lease_seconds: int = LEASE_SECONDS) -> bool:
+    """lease 연장. lease를 잃었으면 False."""
+    async with AsyncSessionLocal() as db:
+        now = _utcnow()
+        result = await db.execute(
+            update(AnalysisJob)
+            .where(
+                AnalysisJob.id == job_id,
+                AnalysisJob.lease_owner == worker_id,
+                AnalysisJob.status == "leased",
+            )
+            .values(
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                heartbeat_at=now,
+                updated_at=now,
+            )
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+
+async def complete_job(job_id: str, worker_id: str):
+    """작업 완료 처리."""
+    await _finish_job(job_id, worker_id, "done", None)
+
+
+async def fail_job(job_id: str, worker_id: str, error: str):
+    """
+    작업 실패 처리.
+
+    파이프라인 예외는 재시도해도 같은 결과(손상된 이미지 등)이므로 바로 실패로 확정.
+    재시도는 워커가 죽어서 lease가 만료된 경우에만 requeue_expired_leases()가 수행.
+    """
+    await _finish_job(job_id, worker_id, "failed", error)
+
+
+async def _finish_job(job_id: str, worker_id: str, status: str, error: Optional[str]):
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job_id, AnalysisJob.lease_owner == worker_id)
+            .values(
+                status=status,
+                last_error=error,
+                lease_expires_at=None,
+                updated_at=_utcnow(),
+            )
+        )
+        await db.commit()
+
+
+async def requeue_expired_leases() -> int:
+    """
+    lease가 만료된 작업(죽은 워커)을 다시 대기열로 돌린다.
+    시도 횟수를 초과한 작업은 실패 처리하고 Analysis도 failed로 마킹.
+
+    Returns: 재등록된 작업 수
+    """
+    async with AsyncSessionLocal() as db:
+        now = _utcnow()
+        result = await db.execute(
+            select(AnalysisJob).where(
+                AnalysisJob.status == "leased",
+                AnalysisJob.lease_expires_at < now,
+            )
+        )
+        expired = result.scalars().all()
+        requeued = 0
+
+        for job in expired:
+            analysis = await db.get(Analysis, job.analysis_id)
+            if job.attempts >= job.max_attempts:
+                job.status = "failed"
+                job.last_error = "lease 만료 (최대 시도 횟수 초과)"
+                if analysis:
+                    analysis.status = "failed"
+                    analysis.error_message = "분석 작업이 반복적으로 중단되었습니다."
+            else:
+                job.status = "queued"
+                requeued += 1
+                if analysis:
+                    analysis.status = "pending"
+                    analysis.progress_step = None
+            job.lease_owner = None
+            job.lease_expires_at = None
+            job.updated_at = now
+
+        await db.commit()
+
+    if expired:
+        print(f"[JobQueue] 만료 lease {len(expired)}개 → 재등록 {requeued}개")
+    return requeued
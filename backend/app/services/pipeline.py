@@ -0,0 +1,115 @@
+"""
+분석 파이프라인 스테이지 그래프 스케줄러.
+
+각 스테이지는 입력/출력 키를 선언하고, 스케줄러는 입력이 모두 준비된 스테이지를
+즉시 동시에 실행한다. CPU 스테이지(프로세스 풀)와 AI 네트워크 스테이지(Gemini)가
+서로를 기다리지 않고 겹쳐서 진행된다.
+
+    stages = [
+        Stage("normalize", pixel_stage, inputs=("design_path",), outputs=("pixel_regions",)),
+        Stage("ai_visual", visual_stage, inputs=("design_path",), outputs=("visual_diffs",)),
+        ...
+    ]
+    results = await run_stage_graph(stages, {"design_path": ...}, on_step=...)
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+
+class Stage:
+    """
+    파이프라인 스테이지 1개.
+
+    fn(**inputs)는 outputs 순서대로 값을 반환하는 코루틴 (출력이 1개면 값 그대로).
+    step은 진행 상태(progress_step)로 노출되는 이름 — 기본값은 스테이지 이름.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[..., Awaitable[Any]],
+        inputs: Sequence[str] = (),
+        outputs: Sequence[str] = (),
+        step: Optional[str] = None,
+    ):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.step = step or name
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name}: {list(self.inputs)} → {list(self.outputs)})"
+
+
+async def run_stage_graph(
+    stages: List[Stage],
+    initial: Dict[str, Any],
+    on_step: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """
+    스테이지 DAG를 실행하고 모든 출력이 합쳐진 결과 dict를 반환.
+
+    진행 단계는 "아직 끝나지 않은 스테이지 중 선언 순서상 가장 앞선 것"의 step.
+    병렬 실행 중에도 progress_step이 앞뒤로 튀지 않고 순서대로만 전진한다.
+    on_step(step, results)은 진행 단계가 바뀔 때마다 호출된다.
+
+    한 스테이지라도 실패하면 나머지를 취소하고 예외를 그대로 올린다.
+    """
+    _validate(stages, initial)
+
+    results: Dict[str, Any] = dict(initial)
+    pending: List[Stage] = list(stages)
+    running: Dict[asyncio.Task, Stage] = {}
+    finished: set = set()
+    current_step: Optional[str] = None
+
+    async def _report_step():
+        nonlocal current_step
+        step = next((s.step for s in stages if s.name not in finished), None)
+        if step is not None and step != current_step:
+            current_step = step
+            if on_step:
+                await on_step(step, results)
+
+    try:
+        await _report_step()
+        while pending or running:
+            ready = [s for s in pending if all(k in results for k in s.inputs)]
+            for stage in ready:
+                pending.remove(stage)
+                kwargs = {k: results[k] for k in stage.inputs}
+                task = asyncio.create_task(stage.fn(**kwargs), name=stage.name)
+                running[task] = stage
+
+            done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                stage = running.pop(task)
+                value = task.result()  # 실패 시 여기서 예외 전파
+                if len(stage.outputs) == 1:
+                    results[stage.outputs[0]] = value
+                elif stage.outputs:
+                    results.update(zip(stage.outputs, value))
+                finished.add(stage.name)
+            await _report_step()
+    finally:
+        for task in running:
+            task.cancel()
+
+    return results
+
+
+def _validate(stages: List[Stage], initial: Dict[str, Any]):
+    """모든 입력이 초기값 또는 다른 스테이지의 출력으로 공급되는지, 순환이 없는지 확인."""
+    available = set(initial)
+    remaining = list(stages)
+    while remaining:
+        ready = [s for s in remaining if all(k in available for k in s.inputs)]
+        if not ready:
+            missing = {s.name: [k for k in s.inputs if k not in available] for s in remaining}
+            raise ValueError(f"스테이지 입력을 공급할 수 없음 (순환 또는 누락): {missing}")
+        for s in ready:
+            remaining.remove(s)
+            available.update(s.outputs)
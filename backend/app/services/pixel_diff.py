@@ -1,13 +1,71 @@
 from __future__ import annotations
 
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import cv2
 import numpy as np
+from skimage.color import deltaE_ciede2000, rgb2lab
 from skimage.metrics import structural_similarity as ssim
 
-
-def compute_diff(img_a: np.ndarray, img_b: np.ndarray) -> tuple[float, list[dict]]:
+from app.services.bbox_index import BBoxIndex, merge_groups_by_iou
+
+
+# ─── 차이 엔진 ───
+# 차이 지도를 만드는 방식만 엔진별로 다르고, 3-pass 영역 추출 이후는 공통.
+#   "ssim":    회색조 SSIM (기본, 구조 변화에 강함)
+#   "absdiff": 채널 최대 절대차 — SSIM 없이 가장 빠름 (CI 스모크 체크용)
+#   "deltae":  Lab 공간 CIEDE2000 — 밝기가 같은 색상 교체도 감지 (브랜드 컬러 검수용)
+DEFAULT_DIFF_ENGINE = "ssim"
+DELTAE_SCALE = 6.0            # ΔE → diff_uint8 배율 (Pass 2 >12 ≈ ΔE 2, Pass 1 >30 ≈ ΔE 5)
+DELTAE_JND = 2.3              # 눈에 띄는 색 차이 기준 — 유사도 = 이 이하 픽셀 비율
+DELTAE_CHUNK_MIN = 65536      # ΔE 병렬 계산 조각의 최소 픽셀 수
+
+# ─── 블록 동일성 검사 ───
+# 정규화된 두 RGB 배열을 DIFF_BLOCK×DIFF_BLOCK 블록 단위로 비교해 완전히 같은 블록을 표시.
+# 모든 블록이 같으면 SSIM 없이 유사도 100%로 바로 반환한다.
+DIFF_BLOCK = 32
+
+# ─── 피라미드(coarse-to-fine) 모드 ───
+# 블록 차이 지도(1/32 해상도)에서 후보 타일만 골라 풀해상도 SSIM/에지 계산을 그 안에서만 수행.
+# 거의 같은 화면(변경 영역이 일부)에서 전체 프레임 SSIM을 피한다.
+PIXEL_DIFF_MODE = "pyramid"   # "pyramid" | "full"
+PYRAMID_MARGIN = 4            # 후보 타일 밖으로 결과가 번지는 폭 (SSIM 창 반경 3, Canny 이웃 2)
+PYRAMID_PAD = 8               # 계산 영역 여유 — margin 바깥 픽셀의 창까지 이미지 안에 포함
+PYRAMID_MAX_COVERAGE = 0.5    # 후보 타일 비율이 이보다 크면 전체 프레임 계산이 더 빠름
+SSIM_WIN_RADIUS = 3           # skimage 기본 win_size=7
+
+# ─── 영역 추출 ───
+# "components": connectedComponentsWithStats 통계(bbox)로 작은 성분을 numpy에서 한 번에 버리고
+#               남은 성분만 윤곽선 계산 (텍스트 안티앨리어싱 노이즈로 윤곽선이 수천 개일 때 유리)
+# "contours":   마스크 전체 findContours → 윤곽선마다 넓이 계산 (기준 구현)
+# 두 방식의 결과(영역, 넓이, 순서)는 같다.
+REGION_LABELING = "components"
+
+# ─── 스트립 병렬 모드 ───
+# 전체 프레임을 봐야 할 때 SSIM을 겹치는 수평 스트립으로 나눠 스레드 풀에서 계산.
+# (scipy/numpy 연산은 GIL을 놓음) 세로 방향 box 합은 정수라 정확하고 가로 방향은
+# 스트립이 원본과 같은 행 전체를 쓰므로, 이어 붙인 결과가 단일 호출과 비트 단위로 같다.
+SSIM_THREADS = min(8, os.cpu_count() or 1)
+SSIM_STRIP_MIN_ROWS = 1024    # 스트립 하나의 최소 높이 — 이보다 작으면 나누지 않음
+SSIM_STRIP_OVERLAP = 8        # 스트립 겹침 (창 반경 3 이상)
+
+_tile_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _get_tile_pool() -> ThreadPoolExecutor:
+    global _tile_pool
+    if _tile_pool is None:
+        _tile_pool = ThreadPoolExecutor(max_workers=SSIM_THREADS, thread_name_prefix="ssim")
+    return _tile_pool
+
+
+def compute_diff(
+    img_a: np.ndarray, img_b: np.ndarray, mode: str = PIXEL_DIFF_MODE,
+    engine: str = DEFAULT_DIFF_ENGINE,
+) -> tuple[float, list[dict]]:
     """
     두 이미지의 픽셀 차이를 다단계 민감도로 분석한다.
 
@@ -16,21 +74,25 @@ def compute_diff(img_a: np.ndarray, img_b: np.ndarray) -> tuple[float, list[dict
     - Pass 2: 세부 차이 (간격, 폰트, 색상)        — 낮은 threshold
     - Pass 3: 에지 차이 (정확한 마진/패딩 감지)    — Canny edge diff
 
+    먼저 블록 단위로 동일 여부를 보고, 전부 같으면 (100.0, [])을 즉시 반환한다.
+    차이 지도는 engine(DIFF_ENGINES 등록 이름)이 계산한다.
+    ssim 엔진에서 mode="pyramid"면 다른 블록에서만 SSIM/에지를 계산한다 (_pyramid_maps).
+
     Returns:
         similarity_score: 0~100 유사도 점수
         regions: 차이 영역 바운딩 박스 목록 [{x, y, w, h, area, sensitivity}, ...]
     """
-    gray_a = cv2.cvtColor(img_a, cv2.COLOR_RGB2GRAY)
-    gray_b = cv2.cvtColor(img_b, cv2.COLOR_RGB2GRAY)
-    img_h, img_w = gray_a.shape[:2]
-    total_area = img_w * img_h
+    changed = _changed_blocks(img_a, img_b, DIFF_BLOCK)
+    if not changed.any():
+        print("[PixelDiff] 모든 블록 동일 → 유사도: 100.0%, 감지 영역 없음")
+        return 100.0, []
 
-    score, diff = ssim(gray_a, gray_b, full=True)
-    similarity = round(float(score) * 100, 2)
-
-    diff_uint8 = (np.abs(1 - diff) * 255).astype(np.uint8)
+    similarity, diff_uint8, edge_diff = get_diff_engine(engine).maps(img_a, img_b, changed, mode)
+    img_h, img_w = diff_uint8.shape[:2]
+    total_area = img_w * img_h
 
     all_regions = []
+    region_index = BBoxIndex()  # all_regions와 같은 순서로 bbox 등록 (커버 판정용)
 
     # ─── Pass 1: 구조적 차이 (큰 레이아웃 변경, 누락 요소) ───
     _, thresh_structural = cv2.threshold(diff_uint8, 30, 255, cv2.THRESH_BINARY)
@@ -39,16 +101,12 @@ def compute_diff(img_a: np.ndarray, img_b: np.ndarray) -> tuple[float, list[dict
     kernel_close = cv2.getStructuringElement(cv2.MORPH_RECT, (9, 7))
     connected = cv2.morphologyEx(thresh_structural, cv2.MORPH_CLOSE, kernel_close)
 
-    contours, _ = cv2.findContours(connected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    for cnt in contours:
-        area = cv2.contourArea(cnt)
-        if area < 100:
-            continue
-        x, y, w, h = cv2.boundingRect(cnt)
+    for x, y, w, h, area in _mask_regions(connected, min_area=100):
         all_regions.append({
             "x": int(x), "y": int(y), "w": int(w), "h": int(h),
             "area": int(area), "sensitivity": "structural",
         })
+        region_index.insert((x, y, w, h))
 
     # ─── Pass 2: 세부 차이 (간격, 색상, 타이포) ───
     _, thresh_detail = cv2.threshold(diff_uint8, 12, 255, cv2.THRESH_BINARY)
@@ -57,36 +115,24 @@ def compute_diff(img_a: np.ndarray, img_b: np.ndarray) -> tuple[float, list[dict
     kernel_close_s = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 3))
     connected_detail = cv2.morphologyEx(thresh_detail, cv2.MORPH_CLOSE, kernel_close_s)
 
-    contours_d, _ = cv2.findContours(connected_detail, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    for cnt in contours_d:
-        area = cv2.contourArea(cnt)
-        if area < 30:
-            continue
-        x, y, w, h = cv2.boundingRect(cnt)
+    for x, y, w, h, area in _mask_regions(connected_detail, min_area=30):
         # Pass 1에서 이미 감지된 영역과 겹치는지 확인
         r = {"x": int(x), "y": int(y), "w": int(w), "h": int(h), "area": int(area)}
-        if not _covered_by(r, all_regions, coverage=0.7):
+        if not _covered_by(r, region_index, coverage=0.7):
             r["sensitivity"] = "detail"
             all_regions.append(r)
+            region_index.insert((x, y, w, h))
 
     # ─── Pass 3: 에지 기반 차이 (마진/패딩/보더 정밀 감지) ───
-    edges_a = cv2.Canny(gray_a, 50, 150)
-    edges_b = cv2.Canny(gray_b, 50, 150)
-    edge_diff = cv2.absdiff(edges_a, edges_b)
-
     kernel_edge = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
     edge_diff = cv2.morphologyEx(edge_diff, cv2.MORPH_CLOSE, kernel_edge)
 
-    contours_e, _ = cv2.findContours(edge_diff, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    for cnt in contours_e:
-        area = cv2.contourArea(cnt)
-        if area < 20:
-            continue
-        x, y, w, h = cv2.boundingRect(cnt)
+    for x, y, w, h, area in _mask_regions(edge_diff, min_area=20):
         r = {"x": int(x), "y": int(y), "w": int(w), "h": int(h), "area": int(area)}
-        if not _covered_by(r, all_regions, coverage=0.6):
+        if not _covered_by(r, region_index, coverage=0.6):
             r["sensitivity"] = "edge"
             all_regions.append(r)
+            region_index.insert((x, y, w, h))
 
     # ─── 후처리: 분할 → 병합 → 정렬 ───
     MAX_REGION_RATIO = 0.15
@@ -119,21 +165,301 @@ def compute_diff(img_a: np.ndarray, img_b: np.ndarray) -> tuple[float, list[dict
     return similarity, final_regions
 
 
-def _covered_by(r: dict, existing: list[dict], coverage: float = 0.7) -> bool:
-    """r이 existing 영역들에 의해 일정 비율 이상 커버되는지 확인."""
-    r_area = r["w"] * r["h"]
-    if r_area <= 0:
+def _mask_regions(mask: np.ndarray, min_area: float) -> list[tuple]:
+    """
+    마스크의 외곽 윤곽선(RETR_EXTERNAL) 중 넓이 min_area 이상인 것의 (x, y, w, h, area).
+
+    넓이는 윤곽선 다각형 넓이(contourArea), 순서는 findContours와 같다.
+    """
+    if REGION_LABELING == "components":
+        mask = _drop_small_components(mask, min_area)
+        if mask is None:
+            return []
+
+    regions = []
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    for cnt in contours:
+        area = cv2.contourArea(cnt)
+        if area < min_area:
+            continue
+        x, y, w, h = cv2.boundingRect(cnt)
+        regions.append((x, y, w, h, area))
+    return regions
+
+
+def _drop_small_components(mask: np.ndarray, min_area: float) -> Optional[np.ndarray]:
+    """
+    bbox로 보아 윤곽선 넓이가 min_area에 못 미칠 연결 성분을 마스크에서 제거.
+
+    외곽 윤곽선은 경계 픽셀 중심을 잇는 다각형이라 contourArea ≤ (w-1)·(h-1)
+    (w, h는 성분 bbox). 이 상한이 min_area 미만이면 윤곽선 넓이 필터에서도 버려진다.
+    구멍 안의 성분은 바깥 성분보다 bbox가 작으므로, 바깥 성분만 버려지고 안쪽이
+    남는 경우는 없다 → 남은 마스크의 외곽 윤곽선은 원래 결과와 같다.
+    남는 성분이 없으면 None.
+    """
+    _, labels, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(
+        mask, 8, cv2.CV_32S, cv2.CCL_GRANA,
+    )
+    w = stats[:, cv2.CC_STAT_WIDTH].astype(np.int64)
+    h = stats[:, cv2.CC_STAT_HEIGHT].astype(np.int64)
+    keep = (w - 1) * (h - 1) >= min_area
+    keep[0] = False  # 배경
+    if not keep.any():
+        return None
+    if keep[1:].all():
+        return mask
+
+    kept = np.flatnonzero(keep)
+    x, y = stats[kept, cv2.CC_STAT_LEFT], stats[kept, cv2.CC_STAT_TOP]
+    if int((w[kept] * h[kept]).sum()) * 2 > mask.size:
+        return keep[labels].view(np.uint8) * np.uint8(255)
+    # 남는 성분이 적으면 전체 라벨 맵 대신 성분 bbox 안만 다시 칠함
+    out = np.zeros_like(mask)
+    for k, kx, ky, kw, kh in zip(kept, x, y, w[kept], h[kept]):
+        roi = (slice(ky, ky + kh), slice(kx, kx + kw))
+        out[roi][labels[roi] == k] = 255
+    return out
+
+
+def _full_maps(gray_a: np.ndarray, gray_b: np.ndarray) -> tuple:
+    """전체 프레임 SSIM + Canny. Returns: (similarity, diff_uint8, edge_diff)"""
+    pool = _get_tile_pool()
+    # Canny는 히스테리시스가 전역 연결이라 이미지 단위로만 나눠 SSIM 스트립과 동시에 실행
+    edges_a = pool.submit(cv2.Canny, gray_a, 50, 150)
+    edges_b = pool.submit(cv2.Canny, gray_b, 50, 150)
+
+    diff = _ssim_map(gray_a, gray_b)
+    # skimage와 같은 방식: 가장자리 창 반경만큼 잘라낸 평균
+    r = SSIM_WIN_RADIUS
+    score = diff[r:-r, r:-r].mean(dtype=np.float64)
+    similarity = round(float(score) * 100, 2)
+    diff_uint8 = (np.abs(1 - diff) * 255).astype(np.uint8)
+
+    edge_diff = cv2.absdiff(edges_a.result(), edges_b.result())
+    return similarity, diff_uint8, edge_diff
+
+
+def _ssim_map(gray_a: np.ndarray, gray_b: np.ndarray) -> np.ndarray:
+    """SSIM 맵 — 충분히 크면 겹치는 수평 스트립으로 나눠 스레드 풀에서 계산."""
+    img_h = gray_a.shape[0]
+    n_strips = min(SSIM_THREADS, img_h // SSIM_STRIP_MIN_ROWS)
+    if n_strips <= 1:
+        _, diff = ssim(gray_a, gray_b, full=True)
+        return diff
+
+    bounds = np.linspace(0, img_h, n_strips + 1).astype(int)
+
+    def _strip(i: int) -> np.ndarray:
+        y0, y1 = bounds[i], bounds[i + 1]
+        py0 = max(0, y0 - SSIM_STRIP_OVERLAP)
+        py1 = min(img_h, y1 + SSIM_STRIP_OVERLAP)
+        _, strip = ssim(gray_a[py0:py1], gray_b[py0:py1], full=True)
+        return strip[y0 - py0:y1 - py0]
+
+    return np.vstack(list(_get_tile_pool().map(_strip, range(n_strips))))
+
+
+def _changed_blocks(img_a: np.ndarray, img_b: np.ndarray, block: int) -> np.ndarray:
+    """
+    block×block 블록별로 픽셀이 하나라도 다르면 True인 (ceil(h/block), ceil(w/block)) 격자.
+
+    해시 대신 배열 직접 비교 — 한 번 훑는 비용은 같고 충돌이 없다.
+    평균 축소와 달리 +/− 차이가 상쇄되어 놓치는 일도 없다.
+    """
+    channels = img_a.shape[2] if img_a.ndim == 3 else 1
+    # (h, w*c)로 펼쳐 채널까지 한 번에 블록 최대값 — 0이 아니면 다른 블록
+    absdiff = cv2.absdiff(img_a, img_b).reshape(img_a.shape[0], -1)
+    img_h, row_len = absdiff.shape
+    block_w = block * channels
+    absdiff = np.pad(absdiff, ((0, -img_h % block), (0, -row_len % block_w)))
+    grid_h, grid_w = absdiff.shape[0] // block, absdiff.shape[1] // block_w
+    return absdiff.reshape(grid_h, block, grid_w, block_w).max(axis=(1, 3)) > 0
+
+
+def _pyramid_maps(
+    gray_a: np.ndarray, gray_b: np.ndarray, changed: np.ndarray,
+) -> Optional[tuple]:
+    """
+    coarse-to-fine: 후보 타일 안에서만 풀해상도 SSIM/Canny를 계산해 전체 지도로 합침.
+
+    1) changed: _changed_blocks() 격자 — 다른 블록만 후보 (DIFF_BLOCK 크기 타일)
+    2) 인접 후보 타일을 연결 성분으로 묶어 bbox 단위로 계산. 다른 픽셀의 영향은
+       창 반경만큼 타일 밖으로 번지므로 bbox+PYRAMID_MARGIN을 결과(core)로 채택하고,
+       core의 창이 잘리지 않도록 PYRAMID_PAD만큼 더 넓게 계산
+    3) 그 밖은 창 안의 두 이미지가 동일하므로 SSIM=1, 에지 차이=0
+       (Canny 히스테리시스 연결만 예외 — 약한 에지 사슬이 core 밖까지 이어질 때)
+
+    후보 타일이 PYRAMID_MAX_COVERAGE를 넘거나 이미지가 너무 작으면 None (전체 계산).
+    Returns: (similarity, diff_uint8, edge_diff)
+    """
+    img_h, img_w = gray_a.shape[:2]
+    tile = DIFF_BLOCK
+    if img_h < tile or img_w < tile:
+        return None
+
+    coarse = changed
+    coverage = float(coarse.mean())
+    if coverage > PYRAMID_MAX_COVERAGE:
+        print(f"[PixelDiff] 후보 타일 {coverage:.0%} → 전체 프레임 계산")
+        return None
+
+    ssim_map = np.ones((img_h, img_w), dtype=np.float64)
+    edge_diff = np.zeros((img_h, img_w), dtype=np.uint8)
+
+    n_labels, _, stats, _ = cv2.connectedComponentsWithStats(
+        coarse.astype(np.uint8), connectivity=8,
+    )
+    for i in range(1, n_labels):
+        tx, ty, tw, th = stats[i, :4]
+        # core: 후보 타일 bbox + margin (채택 영역) / box: core + pad (계산 영역)
+        x0 = max(0, tx * tile - PYRAMID_MARGIN)
+        y0 = max(0, ty * tile - PYRAMID_MARGIN)
+        x1 = min(img_w, (tx + tw) * tile + PYRAMID_MARGIN)
+        y1 = min(img_h, (ty + th) * tile + PYRAMID_MARGIN)
+        bx0, by0 = max(0, x0 - PYRAMID_PAD), max(0, y0 - PYRAMID_PAD)
+        bx1, by1 = min(img_w, x1 + PYRAMID_PAD), min(img_h, y1 + PYRAMID_PAD)
+        core = (slice(y0 - by0, y1 - by0), slice(x0 - bx0, x1 - bx0))
+
+        box_a = gray_a[by0:by1, bx0:bx1]
+        box_b = gray_b[by0:by1, bx0:bx1]
+        _, box_ssim = ssim(box_a, box_b, full=True)
+        ssim_map[y0:y1, x0:x1] = box_ssim[core]
+
+        box_edges = cv2.absdiff(cv2.Canny(box_a, 50, 150), cv2.Canny(box_b, 50, 150))
+        edge_diff[y0:y1, x0:x1] = box_edges[core]
+
+    # skimage와 같은 방식: 가장자리 창 반경만큼 잘라낸 평균
+    r = SSIM_WIN_RADIUS
+    similarity = round(float(ssim_map[r:-r, r:-r].mean()) * 100, 2)
+    diff_uint8 = (np.abs(1 - ssim_map) * 255).astype(np.uint8)
+    print(f"[PixelDiff] 피라미드: 후보 타일 {int(coarse.sum())}/{coarse.size} "
+          f"({coverage:.0%}), 계산 영역 {n_labels - 1}개")
+    return similarity, diff_uint8, edge_diff
+
+
+class DiffEngine(ABC):
+    """
+    차이 지도 계산 엔진. DIFF_ENGINES에 이름으로 등록되어 compute_diff(engine=...)로 선택된다.
+
+    maps()는 정규화된 두 RGB 배열과 _changed_blocks() 격자를 받아
+    (similarity 0~100, diff_uint8, edge_diff)를 반환:
+      diff_uint8 — 픽셀별 차이 강도 0~255 (Pass 1: >30 구조, Pass 2: >12 세부)
+      edge_diff  — Canny 에지 차이 마스크 (Pass 3)
+    """
+
+    name = ""
+
+    @abstractmethod
+    def maps(self, img_a: np.ndarray, img_b: np.ndarray, changed: np.ndarray, mode: str) -> tuple:
+        ...
+
+
+DIFF_ENGINES: dict[str, DiffEngine] = {}
+
+
+def register_diff_engine(cls: type) -> type:
+    """DiffEngine 서브클래스를 name으로 등록 (데코레이터)."""
+    DIFF_ENGINES[cls.name] = cls()
+    return cls
+
+
+def get_diff_engine(name: str) -> DiffEngine:
+    engine = DIFF_ENGINES.get(name)
+    if engine is None:
+        raise ValueError(f"알 수 없는 차이 엔진: {name} (가능: {', '.join(DIFF_ENGINES)})")
+    return engine
+
+
+@register_diff_engine
+class SsimEngine(DiffEngine):
+    """회색조 SSIM + Canny (기존 방식). mode="pyramid"면 다른 블록 주변만 계산."""
+
+    name = "ssim"
+
+    def maps(self, img_a, img_b, changed, mode):
+        gray_a = cv2.cvtColor(img_a, cv2.COLOR_RGB2GRAY)
+        gray_b = cv2.cvtColor(img_b, cv2.COLOR_RGB2GRAY)
+        maps = _pyramid_maps(gray_a, gray_b, changed) if mode == "pyramid" else None
+        if maps is None:
+            maps = _full_maps(gray_a, gray_b)
+        return maps
+
+
+@register_diff_engine
+class AbsDiffEngine(DiffEngine):
+    """
+    채널별 절대차의 최대값을 그대로 차이 강도로 사용 (SSIM 창 계산 없음).
+
+    유사도 = 100 × (1 − 평균 차이/255). 무손실 스크린샷끼리 비교하는 CI 체크용이며,
+    JPEG 노이즈처럼 미세한 픽셀 흔들림에는 SSIM보다 민감하다.
+    """
+
+    name = "absdiff"
+
+    def maps(self, img_a, img_b, changed, mode):
+        edges = _submit_edge_diff(img_a, img_b)
+        diff_uint8 = _channel_max(cv2.absdiff(img_a, img_b))
+        similarity = round((1 - float(diff_uint8.mean()) / 255) * 100, 2)
+        return similarity, diff_uint8, edges.result()
+
+
+@register_diff_engine
+class DeltaEEngine(DiffEngine):
+    """
+    CIE Lab 공간 CIEDE2000 색차.
+
+    회색조 SSIM은 밝기가 같은 색상 교체(브랜드 컬러 변경 등)를 거의 못 보지만
+    ΔE는 색상/채도 차이를 지각 기준으로 잰다. 다른 픽셀만 모아 Lab 변환·ΔE를
+    벡터 연산하므로 비용은 변경 면적에 비례한다.
+    diff_uint8 = ΔE × DELTAE_SCALE, 유사도 = ΔE ≤ DELTAE_JND 인 픽셀 비율.
+    """
+
+    name = "deltae"
+
+    def maps(self, img_a, img_b, changed, mode):
+        img_h, img_w = img_a.shape[:2]
+        edges = _submit_edge_diff(img_a, img_b)
+
+        idx = np.flatnonzero(_channel_max(cv2.absdiff(img_a, img_b)))
+        pixels_a = img_a.reshape(-1, 1, 3)[idx]
+        pixels_b = img_b.reshape(-1, 1, 3)[idx]
+        # 원소별 연산이라 조각으로 나눠 스레드 풀에서 계산 (numpy가 GIL을 놓음)
+        n_chunks = max(1, min(SSIM_THREADS, len(idx) // DELTAE_CHUNK_MIN))
+        chunks = zip(np.array_split(pixels_a, n_chunks), np.array_split(pixels_b, n_chunks))
+        delta_e = np.concatenate(list(_get_tile_pool().map(lambda ab: _ciede2000(*ab), chunks)))
+
+        diff_uint8 = np.zeros(img_h * img_w, dtype=np.uint8)
+        diff_uint8[idx] = np.clip(delta_e * DELTAE_SCALE, 0, 255).astype(np.uint8)
+        visible = int(np.count_nonzero(delta_e > DELTAE_JND))
+        similarity = round((1 - visible / (img_h * img_w)) * 100, 2)
+        return similarity, diff_uint8.reshape(img_h, img_w), edges.result()
+
+
+def _ciede2000(pixels_a: np.ndarray, pixels_b: np.ndarray) -> np.ndarray:
+    """(n, 1, 3) RGB uint8 픽셀 쌍 → (n,) CIEDE2000 ΔE."""
+    return deltaE_ciede2000(rgb2lab(pixels_a), rgb2lab(pixels_b))[:, 0]
+
+
+def _channel_max(diff: np.ndarray) -> np.ndarray:
+    """(h, w, 3) 채널별 차이 → 채널 최대값 (h, w)."""
+    r, g, b = cv2.split(diff)
+    return cv2.max(cv2.max(r, g), b)
+
+
+def _submit_edge_diff(img_a: np.ndarray, img_b: np.ndarray):
+    """회색조 Canny 에지 차이를 타일 풀에서 계산하는 Future (차이 지도 계산과 동시 실행)."""
+    def _edge_diff():
+        gray_a = cv2.cvtColor(img_a, cv2.COLOR_RGB2GRAY)
+        gray_b = cv2.cvtColor(img_b, cv2.COLOR_RGB2GRAY)
+        return cv2.absdiff(cv2.Canny(gray_a, 50, 150), cv2.Canny(gray_b, 50, 150))
+    return _get_tile_pool().submit(_edge_diff)
+
+
+def _covered_by(r: dict, index: BBoxIndex, coverage: float = 0.7) -> bool:
+    """r이 인덱스에 등록된 영역 중 하나에 의해 일정 비율 이상 커버되는지 확인."""
+    if r["w"] * r["h"] <= 0:
         return True
-    for e in existing:
-        ix1 = max(r["x"], e["x"])
-        iy1 = max(r["y"], e["y"])
-        ix2 = min(r["x"] + r["w"], e["x"] + e["w"])
-        iy2 = min(r["y"] + r["h"], e["y"] + e["h"])
-        if ix2 > ix1 and iy2 > iy1:
-            inter = (ix2 - ix1) * (iy2 - iy1)
-            if inter / r_area >= coverage:
-                return True
-    return False
+    return index.max_coverage((r["x"], r["y"], r["w"], r["h"])) >= coverage
 
 
 def _split_large_region(
@@ -148,95 +474,80 @@ def _split_large_region(
     if roi.size == 0:
         return [region]
 
-    h_proj = np.sum(roi > 0, axis=1)
-    gap_threshold = w * 0.03
-    is_gap = h_proj < gap_threshold
-
-    MIN_GAP = 5
-    sub_regions = []
-    start = 0
-    gap_count = 0
-
-    for row in range(len(is_gap)):
-        if is_gap[row]:
-            gap_count += 1
-        else:
-            if gap_count >= MIN_GAP and row - gap_count > start:
-                seg_roi = roi[start:row - gap_count, :]
-                if np.sum(seg_roi > 0) > 50:
-                    sub = _tight_bbox(seg_roi, x, y + start)
-                    if sub:
-                        sub_regions.append(sub)
-                start = row
-            gap_count = 0
-
-    if start < len(is_gap):
-        seg_roi = roi[start:, :]
-        if np.sum(seg_roi > 0) > 50:
-            sub = _tight_bbox(seg_roi, x, y + start)
-            if sub:
-                sub_regions.append(sub)
+    fg = (roi > 0).view(np.uint8)
+    sub_regions = [
+        {"x": x + cx, "y": y + ly, "w": cw, "h": lh, "area": area}
+        for ly, lh, cx, cw, area in _split_segments(fg, 0, gap_ratio=w * 0.03, min_gap=5)
+    ]
 
     if len(sub_regions) <= 1:
-        sub_regions = _split_vertical(roi, x, y)
+        sub_regions = _split_vertical(fg, x, y)
 
     return sub_regions if len(sub_regions) > 1 else [region]
 
 
-def _split_vertical(roi: np.ndarray, offset_x: int, offset_y: int) -> list[dict]:
-    """수직 방향으로 분할 시도."""
-    v_proj = np.sum(roi > 0, axis=0)
-    h_roi = roi.shape[0]
-    gap_threshold = h_roi * 0.03
-    is_gap = v_proj < gap_threshold
+def _split_vertical(fg: np.ndarray, offset_x: int, offset_y: int) -> list[dict]:
+    """수직 방향으로 분할 시도. fg: 차이 픽셀 0/1 uint8"""
+    return [
+        {"x": offset_x + lx, "y": offset_y + cy, "w": lw, "h": ch, "area": area}
+        for lx, lw, cy, ch, area in _split_segments(fg, 1, gap_ratio=fg.shape[0] * 0.03, min_gap=8)
+    ]
 
-    MIN_GAP = 8
-    sub_regions = []
-    start = 0
-    gap_count = 0
 
-    for col in range(len(is_gap)):
-        if is_gap[col]:
-            gap_count += 1
-        else:
-            if gap_count >= MIN_GAP and col - gap_count > start:
-                seg_roi = roi[:, start:col - gap_count]
-                if np.sum(seg_roi > 0) > 50:
-                    sub = _tight_bbox(seg_roi, offset_x + start, offset_y)
-                    if sub:
-                        sub_regions.append(sub)
-                start = col
-            gap_count = 0
-
-    if start < len(is_gap):
-        seg_roi = roi[:, start:]
-        if np.sum(seg_roi > 0) > 50:
-            sub = _tight_bbox(seg_roi, offset_x + start, offset_y)
-            if sub:
-                sub_regions.append(sub)
-
-    return sub_regions
-
-
-def _tight_bbox(roi: np.ndarray, offset_x: int, offset_y: int) -> Optional[dict]:
-    """ROI 내에서 실제 차이 픽셀을 감싸는 타이트한 bbox를 계산."""
-    coords = cv2.findNonZero(roi)
-    if coords is None:
-        return None
-    bx, by, bw, bh = cv2.boundingRect(coords)
+def _split_segments(fg: np.ndarray, axis: int, gap_ratio: float, min_gap: int) -> list[tuple]:
+    """
+    fg(0/1 uint8)를 axis 방향(0: 행, 1: 열)으로 분할해 세그먼트별 타이트 bbox 계산.
+
+    투영값 < gap_ratio인 줄을 gap으로 보고, min_gap 이상 이어진 gap 구간에서 자른다.
+    (맨 앞 gap 구간과 끝까지 이어진 gap 구간에서는 자르지 않음 — gap 줄은 bbox 계산에서 빠짐)
+    픽셀 수가 50 이하인 세그먼트는 버림.
+
+    Returns: (줄 시작, 줄 수, 교차축 시작, 교차축 길이, 넓이) 목록
+    """
+    n_lines = fg.shape[axis]
+    line_proj = cv2.reduce(fg, 1 - axis, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel()
+
+    # gap 구간 run-length: [run_starts[i], run_ends[i])
+    edges = np.diff(np.concatenate(([0], (line_proj < gap_ratio).view(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    cut = (run_ends - run_starts >= min_gap) & (run_starts > 0) & (run_ends < n_lines)
+
+    # 세그먼트 [seg_starts[i], seg_ends[i]) — 픽셀 수는 누적 투영 차로
+    seg_starts = np.concatenate(([0], run_ends[cut]))
+    seg_ends = np.concatenate((run_starts[cut], [n_lines]))
+    line_cum = np.concatenate(([0], np.cumsum(line_proj)))
+    keep = line_cum[seg_ends] - line_cum[seg_starts] > 50
+
+    segments = []
+    for s, e in zip(seg_starts[keep].tolist(), seg_ends[keep].tolist()):
+        seg = fg[s:e] if axis == 0 else fg[:, s:e]
+        cross_proj = cv2.reduce(seg, axis, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel()
+        segments.append(_tight_bbox(line_proj[s:e], cross_proj, s))
+    return segments
+
+
+def _tight_bbox(line_proj: np.ndarray, cross_proj: np.ndarray, offset: int) -> tuple:
+    """
+    세그먼트 안의 차이 픽셀을 감싸는 타이트한 bbox (pad 4, 세그먼트 경계로 자름).
+
+    line_proj/cross_proj는 세그먼트의 두 축 투영. 세그먼트 안에서 bbox 밖 줄은 비어
+    있으므로 pad를 더한 bbox 안 픽셀 수 = bbox 교차축 범위의 cross_proj 합.
+
+    Returns: (줄 시작 + offset, 줄 수, 교차축 시작, 교차축 길이, 넓이)
+    """
+    lines = np.flatnonzero(line_proj)
+    cross = np.flatnonzero(cross_proj)
+    by, bh = int(lines[0]), int(lines[-1] - lines[0] + 1)
+    bx, bw = int(cross[0]), int(cross[-1] - cross[0] + 1)
+
     pad = 4
     bx = max(0, bx - pad)
     by = max(0, by - pad)
-    bw = min(roi.shape[1] - bx, bw + pad * 2)
-    bh = min(roi.shape[0] - by, bh + pad * 2)
-    area = int(np.sum(roi[by:by+bh, bx:bx+bw] > 0))
-    return {
-        "x": offset_x + bx,
-        "y": offset_y + by,
-        "w": bw,
-        "h": bh,
-        "area": max(area, bw * bh // 4),
-    }
+    bw = min(len(cross_proj) - bx, bw + pad * 2)
+    bh = min(len(line_proj) - by, bh + pad * 2)
+    area = int(cross_proj[bx:bx + bw].sum())
+    return offset + by, bh, bx, bw, max(area, bw * bh // 4)
 
 
 def _merge_overlapping(regions: list[dict], iou_threshold: float = 0.3) -> list[dict]:
@@ -244,20 +555,12 @@ def _merge_overlapping(regions: list[dict], iou_threshold: float = 0.3) -> list[
     if not regions:
         return regions
 
+    groups = merge_groups_by_iou(
+        ((r["x"], r["y"], r["w"], r["h"]) for r in regions), iou_threshold,
+    )
     merged = []
-    used = set()
-
-    for i, a in enumerate(regions):
-        if i in used:
-            continue
-        group = [a]
-        for j, b in enumerate(regions):
-            if j <= i or j in used:
-                continue
-            if _iou(a, b) > iou_threshold:
-                group.append(b)
-                used.add(j)
-
+    for ids in groups:
+        group = [regions[i] for i in ids]
         if len(group) == 1:
             merged.append(group[0])
         else:
@@ -274,28 +577,10 @@ def _merge_overlapping(regions: list[dict], iou_threshold: float = 0.3) -> list[
                 "area": sum(g["area"] for g in group),
                 "sensitivity": best_sens.get("sensitivity", "structural"),
             })
-        used.add(i)
 
     return merged
 
 
-def _iou(a: dict, b: dict) -> float:
-    """두 bbox의 IoU (Intersection over Union) 계산."""
-    x1 = max(a["x"], b["x"])
-    y1 = max(a["y"], b["y"])
-    x2 = min(a["x"] + a["w"], b["x"] + b["w"])
-    y2 = min(a["y"] + a["h"], b["y"] + b["h"])
-
-    if x2 <= x1 or y2 <= y1:
-        return 0.0
-
-    intersection = (x2 - x1) * (y2 - y1)
-    area_a = a["w"] * a["h"]
-    area_b = b["w"] * b["h"]
-    union = area_a + area_b - intersection
-    return intersection / union if union > 0 else 0.0
-
-
 def crop_region(img: np.ndarray, region: dict, padding: int = 10) -> np.ndarray:
     """바운딩 박스 영역을 패딩 포함 크롭."""
     h, w = img.shape[:2]
@@ -0,0 +1,129 @@
+"""
+배경 추정 exact/approx 일치율 검증.
+
+    python -m app.tools.validate_bg_median <이미지 또는 디렉터리> [...] [--scale 4]
+
+스크린샷마다 element_analyzer가 쓰는 콘텐츠 마스크 파라미터 조합별로
+exact(원본 medianBlur)와 approx(축소 median + 확대) 마스크를 비교해 출력한다.
+  - 일치: 두 마스크가 같은 픽셀 비율
+  - IoU: 콘텐츠 픽셀 기준 교집합/합집합 (배경이 대부분이라 일치율보다 엄격)
+  - 밴드: _detect_content_bands 결과 밴드 수 (exact → approx)
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from app.services import element_analyzer
+from app.services.element_analyzer import _ImageFeatures, _detect_content_bands
+
+IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".webp"}
+
+# element_analyzer 콘텐츠 마스크 호출부의 (bg_diff_thresh, canny_low, canny_high)
+MASK_PARAMS: List[Tuple[int, int, int]] = [
+    (18, 25, 80),    # _detect_ui_elements, _detect_horizontal_gaps
+    (20, 30, 90),    # _detect_content_bands
+    (25, 40, 100),   # _refine_band_edges
+    (15, 25, 80),    # _detect_sub_bands, _analyze_single_region
+]
+
+
+def _collect_images(paths: List[str]) -> List[Path]:
+    images: List[Path] = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            images.extend(sorted(f for f in p.rglob("*") if f.suffix.lower() in IMAGE_EXTS))
+        else:
+            images.append(p)
+    return images
+
+
+def _timed_features(img: np.ndarray, mode: str) -> Tuple[_ImageFeatures, float]:
+    """배경 추정 단계만 시간 측정 (gray 변환은 제외)."""
+    features = _ImageFeatures(img, bg_mode=mode)
+    _ = features.gray
+    start = time.perf_counter()
+    _ = features.diff_from_bg
+    return features, (time.perf_counter() - start) * 1000
+
+
+def _band_count(img: np.ndarray, features: _ImageFeatures) -> int:
+    h, w = img.shape[:2]
+    with contextlib.redirect_stdout(io.StringIO()):
+        return len(_detect_content_bands(img, w, h, features=features))
+
+
+def validate(path: Path) -> Dict:
+    img = cv2.imread(str(path))
+    if img is None:
+        raise ValueError(f"이미지를 읽을 수 없음: {path}")
+
+    exact, exact_ms = _timed_features(img, "exact")
+    approx, approx_ms = _timed_features(img, "approx")
+
+    masks = []
+    for params in MASK_PARAMS:
+        a = exact.content(*params)
+        b = approx.content(*params)
+        union = int(np.count_nonzero(a | b))
+        masks.append({
+            "params": params,
+            "agreement": float(np.mean(a == b)) * 100,
+            "iou": (np.count_nonzero(a & b) / union * 100) if union else 100.0,
+        })
+
+    return {
+        "name": path.name,
+        "size": img.shape[1::-1],
+        "exact_ms": exact_ms,
+        "approx_ms": approx_ms,
+        "masks": masks,
+        "bands": (_band_count(img, exact), _band_count(img, approx)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="배경 추정 exact/approx 마스크 일치율 검증")
+    parser.add_argument("paths", nargs="+", help="스크린샷 파일 또는 디렉터리")
+    parser.add_argument("--scale", type=int, default=element_analyzer.BG_MEDIAN_SCALE,
+                        help="approx 축소 배율 (기본: BG_MEDIAN_SCALE)")
+    args = parser.parse_args()
+    element_analyzer.BG_MEDIAN_SCALE = args.scale
+
+    images = _collect_images(args.paths)
+    if not images:
+        parser.error("검증할 이미지가 없습니다.")
+
+    results = []
+    for path in images:
+        r = validate(path)
+        results.append(r)
+        w, h = r["size"]
+        print(f"{r['name']} ({w}x{h}): exact {r['exact_ms']:.1f}ms → approx {r['approx_ms']:.1f}ms "
+              f"(×{r['exact_ms'] / max(r['approx_ms'], 1e-6):.1f}), 밴드 {r['bands'][0]} → {r['bands'][1]}")
+        for m in r["masks"]:
+            print(f"    thresh={m['params']}: 일치 {m['agreement']:.2f}%, IoU {m['iou']:.1f}%")
+
+    exact_total = sum(r["exact_ms"] for r in results)
+    approx_total = sum(r["approx_ms"] for r in results)
+    all_masks = [m for r in results for m in r["masks"]]
+    band_same = sum(1 for r in results if r["bands"][0] == r["bands"][1])
+    print(f"\n[요약] {len(results)}장, scale={args.scale}: "
+          f"배경 추정 ×{exact_total / max(approx_total, 1e-6):.1f} "
+          f"({exact_total:.0f}ms → {approx_total:.0f}ms)")
+    print(f"  마스크 일치 최소 {min(m['agreement'] for m in all_masks):.2f}% / "
+          f"평균 {np.mean([m['agreement'] for m in all_masks]):.2f}%, "
+          f"IoU 최소 {min(m['iou'] for m in all_masks):.1f}% / "
+          f"평균 {np.mean([m['iou'] for m in all_masks]):.1f}%")
+    print(f"  밴드 수 동일: {band_same}/{len(results)}장")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+분석 워커 프로세스.
+
+    python -m app.worker [--poll-interval 1.0]
+
+영속 작업 큐(analysis_jobs)에서 작업을 lease하여 _run_analysis 파이프라인을 실행한다.
+한 서버에서 여러 개를 띄우면 API 지연과 무관하게 분석 처리량을 늘릴 수 있다.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+from typing import Optional
+
+from app.models.database import init_db
+from app.api.analyze import _run_analysis
+from app.core.executor import shutdown_compute_pool
+from app.services.job_queue import (
+    LEASE_SECONDS,
+    claim_next_job,
+    complete_job,
+    fail_job,
+    heartbeat,
+    requeue_expired_leases,
+)
+
+REQUEUE_INTERVAL = 60  # 만료 lease 점검 주기 (초)
+
+
+def _default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def _heartbeat_loop(job_id: str, worker_id: str):
+    """실행 중인 작업의 lease를 주기적으로 연장."""
+    while True:
+        await asyncio.sleep(LEASE_SECONDS / 3)
+        if not await heartbeat(job_id, worker_id):
+            print(f"[Worker] lease 상실: job={job_id}")
+            return
+
+
+async def run_worker(
+    worker_id: Optional[str] = None,
+    poll_interval: float = 1.0,
+    stop_event: Optional[asyncio.Event] = None,
+):
+    """작업 큐 폴링 루프. stop_event가 set되면 현재 작업을 마친 뒤 종료."""
+    worker_id = worker_id or _default_worker_id()
+    stop_event = stop_event or asyncio.Event()
+
+    await requeue_expired_leases()
+    loop = asyncio.get_running_loop()
+    last_requeue = loop.time()
+    print(f"[Worker] 시작: {worker_id}")
+
+    while not stop_event.is_set():
+        if loop.time() - last_requeue > REQUEUE_INTERVAL:
+            await requeue_expired_leases()
+            last_requeue = loop.time()
+
+        job = await claim_next_job(worker_id)
+        if job is None:
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        print(f"[Worker] 작업 시작: job={job.id} analysis={job.analysis_id} (시도 {job.attempts})")
+        hb_task = asyncio.create_task(_heartbeat_loop(job.id, worker_id))
+        try:
+            await _run_analysis(job.analysis_id)
+            await complete_job(job.id, worker_id)
+        except Exception as e:
+            # _run_analysis가 Analysis를 failed로 이미 마킹함
+            await fail_job(job.id, worker_id, str(e))
+        finally:
+            hb_task.cancel()
+
+    print(f"[Worker] 종료: {worker_id}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DesignSync 분석 워커")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="빈 큐 폴링 주기 (초)")
+    parser.add_argument("--worker-id", default=None, help="워커 식별자 (기본: host:pid)")
+    args = parser.parse_args()
+
+    async def _main():
+        await init_db()
+        await run_worker(args.worker_id, args.poll_interval)
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown_compute_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,38 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 
 from app.models.database import init_db
-from app.api.analyze import router as analyze_router
+from app.api.analyze import router as analyze_router, MAX_REQUEST_SIZE
 from app.api.share import router as share_router
+from app.core.body_limit import BodySizeLimitMiddleware
 from app.core.config import settings, UPLOAD_PATH
+from app.core.executor import get_compute_pool, shutdown_compute_pool
+from app.worker import run_worker
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+
+    # 단일 프로세스 개발 환경: API 안에서 워커 루프 실행 (CV 스테이지도 여기서 돌므로 풀 생성).
+    # 운영(embedded_worker=false)에서는 python -m app.worker 프로세스가 각자 풀을 만든다.
+    worker_stop = asyncio.Event()
+    worker_task = None
+    if settings.embedded_worker:
+        get_compute_pool()  # CV 프로세스 풀 생성
+        worker_task = asyncio.create_task(run_worker(stop_event=worker_stop))
+
     yield
 
+    worker_stop.set()
+    if worker_task:
+        worker_task.cancel()
+        shutdown_compute_pool()
+
 
 app = FastAPI(title="DesignSync API", version="1.0.0", lifespan=lifespan)
 
@@ -31,6 +50,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 업로드 크기 상한은 폼 파싱(전체 본문 스풀) 전에 적용
+app.add_middleware(BodySizeLimitMiddleware, path="/api/analyze", max_bytes=MAX_REQUEST_SIZE)
+
 app.include_router(analyze_router)
 app.include_router(share_router)
 
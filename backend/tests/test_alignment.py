@@ -0,0 +1,146 @@
+"""
+align_ordered (행 단위 벡터 DP + 밴드 구간)가 이전 매처들의 이중 루프 DP와
+같은 매칭 쌍을 내는지 검증. 밴드가 있으면 밴드 밖 점수를 -inf로 둔 기준 DP와 비교한다.
+"""
+import numpy as np
+import pytest
+
+from app.services.alignment import align_ordered, shift_band
+
+
+def _ref_align(score, min_score):
+    """이전 _match_* 함수들의 DP 루프 (동점 처리: match → skip_d → skip_v)."""
+    n_d, n_v = score.shape
+    dp = np.zeros((n_d + 1, n_v + 1))
+    choice = [[None] * (n_v + 1) for _ in range(n_d + 1)]
+    for di in range(1, n_d + 1):
+        for vi in range(1, n_v + 1):
+            skip_d = dp[di - 1][vi]
+            skip_v = dp[di][vi - 1]
+            match = dp[di - 1][vi - 1] + score[di - 1][vi - 1]
+            best = max(skip_d, skip_v, match)
+            dp[di][vi] = best
+            if best == match and score[di - 1][vi - 1] >= min_score:
+                choice[di][vi] = "match"
+            elif best == skip_d:
+                choice[di][vi] = "skip_d"
+            else:
+                choice[di][vi] = "skip_v"
+
+    pairs = []
+    di, vi = n_d, n_v
+    while di > 0 and vi > 0:
+        c = choice[di][vi]
+        if c == "match":
+            pairs.append((di - 1, vi - 1))
+            di -= 1
+            vi -= 1
+        elif c == "skip_d":
+            di -= 1
+        else:
+            vi -= 1
+    pairs.reverse()
+    return pairs
+
+
+def _ref_banded(score, min_score, allowed):
+    return _ref_align(np.where(allowed, score, -np.inf), min_score)
+
+
+# ── 빈 입력 ──
+
+@pytest.mark.parametrize("shape", [(0, 0), (0, 5), (5, 0)])
+def test_empty(shape):
+    score = np.zeros(shape)
+    assert align_ordered(score, 0.5) == []
+    assert align_ordered(score, 0.5, np.ones(shape, dtype=bool)) == []
+
+
+def test_band_allows_nothing():
+    score = np.ones((4, 6))
+    assert align_ordered(score, 0.0, np.zeros((4, 6), dtype=bool)) == []
+
+
+# ── 동점 ──
+
+@pytest.mark.parametrize("score", [
+    np.zeros((3, 3)),
+    np.ones((3, 4)),
+    np.full((5, 2), 0.5),
+    np.array([[1.0, 1.0, 0.0],
+              [1.0, 1.0, 1.0],
+              [0.0, 1.0, 1.0]]),
+    np.array([[0.5, 0.5],
+              [0.5, 0.5],
+              [1.0, 0.0]]),
+])
+@pytest.mark.parametrize("min_score", [0.0, 0.5, 0.9])
+def test_ties_fixed(score, min_score):
+    assert align_ordered(score, min_score) == _ref_align(score, min_score)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_ties_random(seed):
+    rng = np.random.default_rng(seed)
+    n_d, n_v = (int(n) for n in rng.integers(1, 25, size=2))
+    score = np.round(rng.random((n_d, n_v)) * 4) / 8  # 0, 0.125, … 0.5 — 동점 다수
+    for min_score in (0.0, 0.25, 0.4):
+        assert align_ordered(score, min_score) == _ref_align(score, min_score)
+
+
+# ── 밴드 없음 ──
+
+@pytest.mark.parametrize("seed", range(40))
+def test_unbanded_random(seed):
+    rng = np.random.default_rng(1000 + seed)
+    n_d, n_v = (int(n) for n in rng.integers(1, 40, size=2))
+    score = rng.random((n_d, n_v))
+    for min_score in (0.0, 0.3, 0.6):
+        assert align_ordered(score, min_score) == _ref_align(score, min_score)
+
+
+def test_min_score_blocks_match():
+    # 대각 합이 최대여도 min_score 미만 쌍은 채택하지 않음
+    score = np.array([[0.2, 0.0],
+                      [0.0, 0.9]])
+    assert align_ordered(score, 0.5) == [(1, 1)]
+    assert align_ordered(score, 0.1) == [(0, 0), (1, 1)]
+
+
+# ── 밴드 ──
+
+def test_full_band_equals_unbanded():
+    rng = np.random.default_rng(7)
+    score = rng.random((15, 18))
+    allowed = np.ones(score.shape, dtype=bool)
+    assert align_ordered(score, 0.3, allowed) == align_ordered(score, 0.3)
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_shift_band_random(seed):
+    rng = np.random.default_rng(2000 + seed)
+    n_d, n_v = (int(n) for n in rng.integers(1, 40, size=2))
+    score = rng.random((n_d, n_v)) if seed % 3 else np.round(rng.random((n_d, n_v)) * 4) / 8
+    # 정렬된 위치 (실제 요소 center_y) / 뒤섞인 위치 (밴드 구간이 불규칙)
+    d_pos = np.sort(rng.random(n_d)) if seed % 5 else rng.random(n_d)
+    v_pos = np.sort(rng.random(n_v)) if seed % 7 else rng.random(n_v)
+    for max_shift in (0.0, 0.05, 0.2, 0.5):
+        allowed = shift_band(d_pos, v_pos, max_shift)
+        for min_score in (0.0, 0.4):
+            assert align_ordered(score, min_score, allowed) == _ref_banded(score, min_score, allowed)
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_irregular_mask(seed):
+    # 행마다 허용 열이 흩어진 임의 마스크 (구간을 넓혀 계산하는 경로)
+    rng = np.random.default_rng(3000 + seed)
+    n_d, n_v = (int(n) for n in rng.integers(1, 30, size=2))
+    score = rng.random((n_d, n_v))
+    allowed = rng.random((n_d, n_v)) < rng.random()
+    assert align_ordered(score, 0.2, allowed) == _ref_banded(score, 0.2, allowed)
+
+
+def test_shift_band_mask():
+    allowed = shift_band(np.array([0.1, 0.5]), np.array([0.0, 0.3, 0.6]), 0.2)
+    assert allowed.tolist() == [[True, True, False],
+                                [False, True, True]]
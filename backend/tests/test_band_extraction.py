@@ -0,0 +1,247 @@
+"""
+밴드 추출 벡터화(_true_runs / _first_true / _mask_density / _extract_bands /
+_refine_band_edges)가 이전 행·열 단위 루프 구현과 같은 결과를 내는지 검증.
+
+_ref_* 함수는 벡터화 이전 element_analyzer 코드를 그대로 옮긴 기준 구현이다.
+"""
+import numpy as np
+import pytest
+
+from app.services.element_analyzer import (
+    _extract_bands,
+    _first_true,
+    _mask_density,
+    _refine_band_edges,
+    _true_runs,
+)
+
+
+# ── 기준 구현 (이전 루프) ──
+
+def _ref_true_runs(mask, min_len=1):
+    runs = []
+    start = None
+    for i, v in enumerate(mask):
+        if v and start is None:
+            start = i
+        elif not v and start is not None:
+            if i - start >= min_len:
+                runs.append((start, i))
+            start = None
+    if start is not None and len(mask) - start >= min_len:
+        runs.append((start, len(mask)))
+    return runs
+
+
+def _ref_first_true(mask):
+    for i, v in enumerate(mask):
+        if v:
+            return i
+    return None
+
+
+def _ref_extract_bands(combined, is_content, min_band_h, min_gap_h):
+    h, w = combined.shape
+    bands = []
+    band_start = None
+    for row in range(h):
+        if is_content[row] and band_start is None:
+            band_start = row
+        elif not is_content[row] and band_start is not None:
+            if row - band_start >= min_band_h:
+                bands.append({"y_start": band_start, "y_end": row})
+            band_start = None
+    if band_start is not None and h - band_start >= min_band_h:
+        bands.append({"y_start": band_start, "y_end": h})
+
+    merged = []
+    for band in bands:
+        if merged and band["y_start"] - merged[-1]["y_end"] < min_gap_h:
+            merged[-1]["y_end"] = band["y_end"]
+        else:
+            merged.append(dict(band))
+
+    for band in merged:
+        y1, y2 = band["y_start"], band["y_end"]
+        band["height"] = y2 - y1
+        band["center_y"] = (y1 + y2) // 2
+
+        band_content = combined[y1:y2, :]
+        v_proj = np.mean(band_content.astype(np.float32), axis=0)
+
+        band["left_margin"] = 0
+        for col in range(w):
+            if v_proj[col] > 0.03:
+                band["left_margin"] = col
+                break
+
+        band["right_margin"] = 0
+        for col in range(w - 1, -1, -1):
+            if v_proj[col] > 0.03:
+                band["right_margin"] = (w - 1) - col
+                break
+
+        band["content_width"] = w - band["left_margin"] - band["right_margin"]
+        band["density"] = float(np.mean(band_content))
+    return merged
+
+
+def _ref_refine_band_edges(bands, content_mask):
+    combined = np.mean(content_mask.astype(np.float32), axis=1)
+    for band in bands:
+        y1, y2 = band["y_start"], band["y_end"]
+        max_trim = min((y2 - y1) // 4, 30)
+
+        new_y1 = y1
+        for row in range(y1, min(y2, y1 + max_trim)):
+            if combined[row] >= 0.025:
+                new_y1 = row
+                break
+
+        new_y2 = y2
+        for row in range(y2 - 1, max(y1, y2 - max_trim) - 1, -1):
+            if combined[row] >= 0.025:
+                new_y2 = row + 1
+                break
+
+        if new_y2 - new_y1 >= 8:
+            band["y_start"] = new_y1
+            band["y_end"] = new_y2
+            band["height"] = new_y2 - new_y1
+            band["center_y"] = (new_y1 + new_y2) // 2
+    return bands
+
+
+class _StubFeatures:
+    """_refine_band_edges가 쓰는 _ImageFeatures 부분만 흉내 (고정 콘텐츠 마스크)."""
+
+    def __init__(self, mask):
+        self.gray = np.zeros(mask.shape, dtype=np.uint8)
+        self._mask = mask
+
+    def content(self, **_kwargs):
+        return self._mask
+
+
+# ── 테스트 데이터 ──
+
+FIXED_1D = [
+    [],
+    [False],
+    [True],
+    [False, False, False],
+    [True, True, True],
+    [True, False, True, True, False, False, True],
+    [False, True, True, False, True],
+]
+
+
+def _random_screen(seed, h=240, w=90):
+    """가로 띠 모양 콘텐츠 + 잡음 픽셀이 있는 bool 마스크."""
+    rng = np.random.default_rng(seed)
+    mask = rng.random((h, w)) < 0.01
+    y = int(rng.integers(0, 10))
+    while y < h:
+        band_h = int(rng.integers(1, 30))
+        x1 = int(rng.integers(0, w // 3))
+        x2 = int(rng.integers(2 * w // 3, w + 1))
+        mask[y:y + band_h, x1:x2] |= rng.random((min(band_h, h - y), x2 - x1)) < 0.6
+        y += band_h + int(rng.integers(0, 25))
+    return mask
+
+
+def _fixed_screen():
+    mask = np.zeros((120, 60), dtype=bool)
+    mask[0:12, 5:55] = True      # 이미지 위 끝에 붙은 밴드
+    mask[20:22, 10:50] = True    # min_band_h 미만 → 버려짐
+    mask[30:50, 0:60] = True     # 좌우 여백 0
+    mask[53:70, 20:25] = True    # 좁은 간격 → 위 밴드와 병합
+    mask[100:120, 40:60] = True  # 이미지 아래 끝까지 이어지는 밴드
+    return mask
+
+
+# ── 기본 도우미 ──
+
+@pytest.mark.parametrize("values", FIXED_1D)
+@pytest.mark.parametrize("min_len", [1, 2, 3])
+def test_true_runs_fixed(values, min_len):
+    mask = np.array(values, dtype=bool)
+    assert _true_runs(mask, min_len) == _ref_true_runs(mask, min_len)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_true_runs_random(seed):
+    rng = np.random.default_rng(seed)
+    mask = rng.random(int(rng.integers(0, 300))) < rng.random()
+    for min_len in (1, 2, 5, 12):
+        assert _true_runs(mask, min_len) == _ref_true_runs(mask, min_len)
+
+
+@pytest.mark.parametrize("values", FIXED_1D)
+def test_first_true_fixed(values):
+    mask = np.array(values, dtype=bool)
+    assert _first_true(mask) == _ref_first_true(mask)
+    assert _first_true(mask[::-1]) == _ref_first_true(mask[::-1])
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_first_true_random(seed):
+    rng = np.random.default_rng(seed)
+    mask = rng.random(int(rng.integers(0, 200))) < rng.random() * 0.05
+    assert _first_true(mask) == _ref_first_true(mask)
+    assert _first_true(mask[::-1]) == _ref_first_true(mask[::-1])
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("axis", [0, 1])
+def test_mask_density_bit_identical(seed, axis):
+    rng = np.random.default_rng(seed)
+    shape = tuple(int(n) for n in rng.integers(1, 400, size=2))
+    mask = rng.random(shape) < rng.random()
+    expected = np.mean(mask.astype(np.float32), axis=axis)
+    got = _mask_density(mask, axis=axis)
+    assert got.dtype == np.float32
+    assert np.array_equal(got, expected)
+
+
+# ── 밴드 / 마진 / 경계 보정 ──
+
+def _band_params(mask):
+    h_proj = np.mean(mask.astype(np.float32), axis=1)
+    return [
+        (h_proj > thresh, min_band_h, min_gap_h)
+        for thresh in (0.02, 0.1)
+        for min_band_h, min_gap_h in ((3, 2), (8, 6))
+    ]
+
+
+def test_extract_bands_fixed():
+    mask = _fixed_screen()
+    for is_content, min_band_h, min_gap_h in _band_params(mask):
+        expected = _ref_extract_bands(mask, is_content, min_band_h, min_gap_h)
+        assert _extract_bands(mask, is_content, min_band_h, min_gap_h) == expected
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_extract_bands_random(seed):
+    mask = _random_screen(seed)
+    for is_content, min_band_h, min_gap_h in _band_params(mask):
+        expected = _ref_extract_bands(mask, is_content, min_band_h, min_gap_h)
+        assert _extract_bands(mask, is_content, min_band_h, min_gap_h) == expected
+
+
+def test_extract_bands_empty_mask():
+    mask = np.zeros((50, 30), dtype=bool)
+    is_content = np.zeros(50, dtype=bool)
+    assert _extract_bands(mask, is_content, 3, 2) == []
+
+
+@pytest.mark.parametrize("seed", ["fixed"] + list(range(30)))
+def test_refine_band_edges(seed):
+    mask = _fixed_screen() if seed == "fixed" else _random_screen(seed)
+    h_proj = np.mean(mask.astype(np.float32), axis=1)
+    # 보정 여지가 있도록 느슨한 임계값으로 밴드를 잡는다
+    bands = _ref_extract_bands(mask, h_proj > 0.005, 3, 4)
+    expected = _ref_refine_band_edges([dict(b) for b in bands], mask)
+    got = _refine_band_edges([dict(b) for b in bands], None, features=_StubFeatures(mask))
+    assert got == expected
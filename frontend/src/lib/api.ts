@@ -17,7 +17,7 @@ export async function startAnalysis(
     const err = await res.json().catch(() => ({}));
     throw new Error(err.detail ?? "업로드 실패");
   }
-  return res.json() as Promise<{ analysis_id: string; status: string; pipeline_version?: string }>;
+  return res.json() as Promise<{ analysis_id: string; status: string; pipeline_version?: string; cached?: boolean }>;
 }
 
 export async function getStatus(id: string) {